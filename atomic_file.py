@@ -0,0 +1,23 @@
+import os
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode='w', **open_kwargs):
+    """Opens <path>.tmp for writing and renames it over `path` when the block completes.
+
+    Readers see either the old file or the complete new one, never a partial
+    write. If the block (or the rename) fails, the temp file is removed and
+    `path` is left untouched.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, mode, **open_kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,131 @@
+import io
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import wave
+
+MAX_PENDING_CUES = 4 # Cues queued beyond this are dropped instead of piling up
+# Command-line players tried when neither simpleaudio nor playsound is installed
+OS_PLAYERS = {'darwin': ('afplay',), 'linux': ('paplay', 'aplay', 'pw-play')}
+
+
+class TickPlayer:
+    """Plays the tick sound from memory on a dedicated worker thread.
+
+    The WAV file is read and decoded once, on the worker itself so start()
+    returns immediately. play() only puts a command on a queue, so the timer
+    loop never waits for playback. Backends, in order of preference:
+
+      simpleaudio   plays the decoded buffer from memory; cues overlap
+      playsound     the original dependency; each cue plays on its own
+                    short-lived thread, so cues overlap
+      OS player     afplay (macOS) or paplay/aplay/pw-play (Linux), one
+                    process per cue, so cues overlap
+      winsound      built into Windows; cues play one after another
+
+    If no backend works (or the file can't be read) the player is disabled
+    and play() does nothing, without touching the disk again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._commands = queue.Queue()
+        self._thread = None
+        self._play = None # Backend callable, None when playback is unavailable
+        self._active_plays = []
+        self._disabled = False # Set by the worker once it knows nothing can be played
+
+    @property
+    def available(self):
+        return self._play is not None
+
+    def _load(self):
+        """Reads and decodes the WAV file, then picks a playback backend."""
+        try:
+            with open(self.path, 'rb') as f:
+                wav_bytes = f.read()
+            with wave.open(io.BytesIO(wav_bytes), 'rb') as wav:
+                channels = wav.getnchannels()
+                sample_width = wav.getsampwidth()
+                frame_rate = wav.getframerate()
+                pcm = wav.readframes(wav.getnframes())
+        except (IOError, EOFError, wave.Error):
+            return
+
+        try:
+            import simpleaudio
+            def play_simpleaudio():
+                play_obj = simpleaudio.play_buffer(pcm, channels, sample_width, frame_rate)
+                self._active_plays = [p for p in self._active_plays if p.is_playing()] + [play_obj]
+            self._play = play_simpleaudio
+            return
+        except ImportError:
+            pass
+
+        try:
+            from playsound import playsound
+            def play_playsound():
+                thread = threading.Thread(target=self._play_file_with, args=(playsound,), name="tick-playsound", daemon=True)
+                thread.start()
+            self._play = play_playsound
+            return
+        except ImportError:
+            pass
+
+        player = next(filter(None, (shutil.which(name) for name in OS_PLAYERS.get(sys.platform, ()))), None)
+        if player is not None:
+            def play_os_player():
+                process = subprocess.Popen([player, self.path], stdin=subprocess.DEVNULL,
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                self._active_plays = [p for p in self._active_plays if p.poll() is None] + [process] # Reaps finished players
+            self._play = play_os_player
+            return
+
+        try:
+            import winsound
+            self._play = lambda: winsound.PlaySound(wav_bytes, winsound.SND_MEMORY) # Blocks the worker, not the timer
+        except ImportError:
+            pass
+
+    def _play_file_with(self, play_file):
+        try:
+            play_file(self.path)
+        except Exception: # playsound raises its own exception type; any failure means no sound from now on
+            self._play = None
+            self._disabled = True
+
+    def start(self):
+        """Starts the playback worker, which loads the sound before serving cues."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name="tick-player", daemon=True)
+            self._thread.start()
+
+    def play(self):
+        """Queues one tick. Returns immediately."""
+        if self._thread is not None and not self._disabled and self._commands.qsize() < MAX_PENDING_CUES:
+            self._commands.put('play')
+
+    def close(self):
+        """Stops the worker after the queued cues."""
+        if self._thread is not None:
+            self._commands.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _worker(self):
+        self._load()
+        if self._play is None:
+            self._disabled = True
+            return
+        while True:
+            command = self._commands.get()
+            if command is None:
+                break
+            try:
+                self._play()
+            except Exception: # Audio device went away etc.: stay silent from now on
+                self._play = None
+                self._disabled = True
+                break
@@ -0,0 +1,32 @@
+import threading
+
+
+class BackgroundCall:
+    """Runs fn(*args) on a daemon thread so the caller can keep going meanwhile.
+
+    result() waits for the call to finish and returns its value, re-raising any
+    exception it raised in the caller's thread.
+    """
+
+    def __init__(self, fn, *args, name="background-call"):
+        self._fn = fn
+        self._args = args
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._result = self._fn(*self._args)
+        except BaseException as e: # Handed back to whoever calls result()
+            self._error = e
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def result(self):
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
@@ -0,0 +1,235 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date as Date, datetime, timedelta
+
+# --- Per-student data directory layout (same file names main.py uses) ---
+SESSION_CSV_NAME = "session_data.csv"
+SESSION_LOG_NAME = "session_log"
+BONUS_POOL_NAME = "bonus_pool.pkl"
+DAILY_TRACKER_NAME = "daily_questions_tracker.pkl"
+STATE_DB_NAME = "qimer_state.db" # SQLite backend; once present it holds everything the files above did
+USER_MARKERS = (SESSION_CSV_NAME, SESSION_LOG_NAME, BONUS_POOL_NAME, DAILY_TRACKER_NAME, STATE_DB_NAME)
+MIN_QUESTIONS_FOR_PACE = 50 # Students need this many questions to appear on the pace leaderboard
+
+
+def find_user_dirs(root):
+    """Immediate subdirectories of `root` that look like a student's Qimer data directory."""
+    user_dirs = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir() and any(os.path.exists(os.path.join(entry.path, name)) for name in USER_MARKERS):
+                user_dirs.append(entry.path)
+    return sorted(user_dirs)
+
+
+def streaks(dates, today):
+    """(current, best) runs of consecutive study days; current is 0 unless it reaches today or yesterday."""
+    best = run = 0
+    previous = None
+    for day in sorted({Date.fromisoformat(d) for d in dates}):
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        best = max(best, run)
+        previous = day
+    current = run if previous is not None and Date.fromisoformat(today) - previous <= timedelta(days=1) else 0
+    return current, best
+
+
+def load_user_state(data_dir):
+    """(sessions, daily tracker, bonus pool) from whichever backend the student uses, read-only."""
+    db_path = os.path.join(data_dir, STATE_DB_NAME)
+    if os.path.exists(db_path):
+        from sqlite_store import SQLiteStateStore
+        store = SQLiteStateStore(db_path, read_only=True)
+        try:
+            return store.load_sessions(), store.load_daily_tracker(), store.load_bonus_pool()
+        finally:
+            store.close()
+    import main
+    sessions = main.load_session_data_from_csv(os.path.join(data_dir, SESSION_LOG_NAME), os.path.join(data_dir, SESSION_CSV_NAME))
+    tracker = main.load_daily_questions_tracker(os.path.join(data_dir, DAILY_TRACKER_NAME))
+    bonus_pool = main.load_bonus_pool_from_file(os.path.join(data_dir, BONUS_POOL_NAME))
+    return sessions, tracker, bonus_pool
+
+
+def summarize_user(data_dir, today):
+    """One student's totals, read with the same loaders main.py uses (read-only)."""
+    sessions, tracker, bonus_pool = load_user_state(data_dir)
+
+    questions = sum(s['total_questions_in_session'] for s in sessions)
+    seconds = sum(s['total_time_taken'] for s in sessions)
+    subjects = {}
+    for s in sessions:
+        totals = subjects.setdefault(s['subject'], [0, 0, 0.0])
+        totals[0] += 1
+        totals[1] += s['total_questions_in_session']
+        totals[2] += s['total_time_taken']
+    valid_dates = []
+    for s in sessions:
+        try:
+            Date.fromisoformat(s['date'])
+            valid_dates.append(s['date'])
+        except (TypeError, ValueError):
+            pass
+    current_streak, best_streak = streaks(valid_dates, today)
+    return {
+        'user': os.path.basename(os.path.normpath(data_dir)),
+        'sessions': len(sessions),
+        'questions': questions,
+        'seconds': seconds,
+        'avg_time_per_q': seconds / questions if questions else 0.0,
+        'bonus_pool': bonus_pool,
+        'questions_today': tracker['count'] if tracker['date'] == today else 0,
+        'last_date': max(valid_dates) if valid_dates else None,
+        'current_streak': current_streak,
+        'best_streak': best_streak,
+        'subjects': subjects,
+    }
+
+
+def summarize_shard(data_dirs, today):
+    """Worker: summarizes a batch of directories. Returns (user summaries, per-subject totals, warnings)."""
+    users, subjects, warnings = [], {}, []
+    for data_dir in data_dirs:
+        captured = io.StringIO() # The loaders print warnings; collect them instead of interleaving workers' output
+        try:
+            with contextlib.redirect_stdout(captured):
+                user = summarize_user(data_dir, today)
+        except Exception as e:
+            warnings.append(f"{data_dir}: {e}")
+            continue
+        warnings.extend(f"{data_dir}: {line}" for line in captured.getvalue().splitlines() if line)
+        users.append(user)
+        for subject, (sessions, questions, seconds) in user.pop('subjects').items():
+            totals = subjects.setdefault(subject, {'students': 0, 'sessions': 0, 'questions': 0, 'seconds': 0.0})
+            totals['students'] += 1
+            totals['sessions'] += sessions
+            totals['questions'] += questions
+            totals['seconds'] += seconds
+    return users, subjects, warnings
+
+
+def merge_subjects(into, partial):
+    for subject, totals in partial.items():
+        target = into.setdefault(subject, {'students': 0, 'sessions': 0, 'questions': 0, 'seconds': 0.0})
+        for key, value in totals.items():
+            target[key] += value
+
+
+def build_report(users, subjects, top):
+    """Reduces the per-student summaries into cohort leaderboards."""
+    paced = [u for u in users if u['questions'] >= MIN_QUESTIONS_FOR_PACE]
+    return {
+        'students': len(users),
+        'sessions': sum(u['sessions'] for u in users),
+        'questions': sum(u['questions'] for u in users),
+        'hours': sum(u['seconds'] for u in users) / 3600,
+        'leaderboards': {
+            'questions': sorted(users, key=lambda u: (-u['questions'], u['user']))[:top],
+            'hours': sorted(users, key=lambda u: (-u['seconds'], u['user']))[:top],
+            'today': sorted((u for u in users if u['questions_today']), key=lambda u: (-u['questions_today'], u['user']))[:top],
+            'current_streak': sorted((u for u in users if u['current_streak']), key=lambda u: (-u['current_streak'], u['user']))[:top],
+            'best_streak': sorted(users, key=lambda u: (-u['best_streak'], u['user']))[:top],
+            'pace': sorted(paced, key=lambda u: (u['avg_time_per_q'], u['user']))[:top],
+        },
+        'subjects': subjects,
+    }
+
+
+def run_batch_report(root, workers=None, shard_size=None, top=10, today=None, progress=sys.stderr):
+    """Summarizes every data directory under `root` on a process pool and reduces the results."""
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    user_dirs = find_user_dirs(root)
+    workers = workers or os.cpu_count() or 1
+    if shard_size is None: # Several shards per worker keeps cores busy when directories differ in size
+        shard_size = max(1, min(64, len(user_dirs) // (workers * 8)))
+    shards = [user_dirs[i:i + shard_size] for i in range(0, len(user_dirs), shard_size)]
+
+    users, subjects, warnings = [], {}, []
+    started = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(summarize_shard, shard, today): len(shard) for shard in shards}
+        for future in as_completed(futures):
+            shard_users, shard_subjects, shard_warnings = future.result()
+            users.extend(shard_users)
+            merge_subjects(subjects, shard_subjects)
+            warnings.extend(shard_warnings)
+            done += futures[future]
+            if progress is not None:
+                elapsed = time.perf_counter() - started
+                progress.write(f"\rProcessed {done}/{len(user_dirs)} directories ({done / elapsed if elapsed else 0:.0f}/s)")
+                progress.flush()
+    if progress is not None and user_dirs:
+        progress.write("\n")
+
+    report = build_report(users, subjects, top)
+    report['today'] = today
+    report['workers'] = workers
+    report['elapsed_seconds'] = time.perf_counter() - started
+    report['warnings'] = warnings
+    return report
+
+
+def print_report(report, out=sys.stdout):
+    write = lambda line="": out.write(line + "\n")
+    write(f"{report['students']} students, {report['sessions']} sessions, {report['questions']} questions, "
+          f"{report['hours']:.1f} hours ({report['workers']} workers, {report['elapsed_seconds']:.2f} s)")
+    columns = {
+        'questions': ("Most questions", lambda u: f"{u['questions']}"),
+        'hours': ("Most study time", lambda u: f"{u['seconds'] / 3600:.1f} h"),
+        'today': (f"Most questions today ({report['today']})", lambda u: f"{u['questions_today']}"),
+        'current_streak': ("Longest current streak", lambda u: f"{u['current_streak']} days"),
+        'best_streak': ("Longest streak ever", lambda u: f"{u['best_streak']} days"),
+        'pace': (f"Fastest pace (>= {MIN_QUESTIONS_FOR_PACE} questions)", lambda u: f"{u['avg_time_per_q']:.1f} s/question"),
+    }
+    for key, (title, value) in columns.items():
+        board = report['leaderboards'][key]
+        if not board:
+            continue
+        write()
+        write(f"--- {title} ---")
+        for rank, user in enumerate(board, 1):
+            write(f"{rank:>3}. {user['user']:<24} {value(user)}")
+    write()
+    write(f"{'Subject':<12} {'Students':>8} {'Sessions':>9} {'Questions':>10} {'Hours':>8} {'s/question':>11}")
+    for subject in sorted(report['subjects']):
+        totals = report['subjects'][subject]
+        pace = totals['seconds'] / totals['questions'] if totals['questions'] else 0.0
+        write(f"{subject:<12} {totals['students']:>8} {totals['sessions']:>9} {totals['questions']:>10} "
+              f"{totals['seconds'] / 3600:>8.1f} {pace:>11.1f}")
+    if report['warnings']:
+        write()
+        write(f"{len(report['warnings'])} warnings while reading data, e.g.:")
+        for line in report['warnings'][:5]:
+            write(f"  {line}")
+
+
+# --- Command line entry point ---
+def run_report_command(argv):
+    """Entry point for `python main.py report ROOT`."""
+    parser = argparse.ArgumentParser(prog="main.py report", description="Cohort leaderboards and subject summaries over many students' data directories.")
+    parser.add_argument('root', help="Directory containing one Qimer data directory per student.")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU).")
+    parser.add_argument('--shard-size', type=int, help="Directories per task (default: chosen from the number of directories).")
+    parser.add_argument('--top', type=int, default=10, help="Rows per leaderboard (default 10).")
+    parser.add_argument('--today', help="Date used for today's counts and streaks (YYYY-MM-DD, default: today).")
+    parser.add_argument('--json', help="Also write the full report to this JSON file.")
+    parser.add_argument('--quiet', action='store_true', help="No progress output.")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.root):
+        print(f"'{args.root}' is not a directory.")
+        return None
+    report = run_batch_report(args.root, args.workers, args.shard_size, args.top, args.today,
+                              progress=None if args.quiet else sys.stderr)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+    return report
@@ -0,0 +1,316 @@
+"""Persistence benchmark: how Qimer's storage paths behave as the history grows.
+
+Usage (from the repository root):
+    python benchmarks/bench_persistence.py                      # 1k, 10k, 100k sessions; compare with the baseline
+    python benchmarks/bench_persistence.py --full               # also 1M and 10M sessions
+    python benchmarks/bench_persistence.py --scales 1000,50000 --save-baseline
+
+For every scale a synthetic history is generated in a temporary directory and
+each storage path is measured through the functions main.py itself uses:
+
+  file     session log: load_session_data_from_csv, save_session_data_to_csv, get_next_session_num
+  sqlite   SQLiteStateStore: load_sessions, commit_session_end, next_session_num
+  pickles  load/save_bonus_pool_*, load/save_daily_questions_tracker (size independent, measured once)
+  rollups  RollupStore.record_session with the rollups of the whole history
+
+Metrics are load time, append latency (p50/p95 over --appends writes), peak
+Python memory while loading (tracemalloc, measured in a separate pass) and
+size on disk. Results are compared with the saved baseline; anything slower
+or bigger than --tolerance times the baseline (and by more than the noise
+floor in ABSOLUTE_SLACK) is reported and the script exits with status 1.
+Tail latencies (p95) are printed but never gated: over 50 writes they are
+decided by one or two fsyncs. No baseline is shipped, since timings are
+machine specific: run once with --save-baseline on each machine (or CI
+runner) to create benchmarks/baselines/persistence.json.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import main
+from rollups import RollupStore
+from session_log import SessionLog
+from sqlite_store import SQLiteStateStore
+
+DEFAULT_SCALES = [1000, 10000, 100000]
+FULL_SCALES = DEFAULT_SCALES + [1000000, 10000000]
+DEFAULT_BASELINE = os.path.join(REPO_DIR, "benchmarks", "baselines", "persistence.json")
+GENERATE_BATCH = 100000
+FIRST_DAY = date(2015, 1, 1)
+HISTORY_DAYS = 3650
+ABSOLUTE_SLACK = {'s': 0.02, 'ms': 2.0, 'MB': 1.0} # Differences below these are noise, never regressions
+UNGATED_SUFFIXES = ('_p95',) # Reported only: a single slow fsync moves them
+
+
+# --- Synthetic history ---
+def sessions_per_day(count):
+    """Three a day for one student's history; denser for huge ones so dates stay within ~10 years."""
+    return max(3, -(-count // HISTORY_DAYS))
+
+
+def last_day(count, extra_days=0):
+    return (FIRST_DAY + timedelta(days=count // sessions_per_day(count) + extra_days)).isoformat()
+
+
+def synthetic_sessions(count, seed=1):
+    """Three subjects, realistic durations, ordered by date like real history."""
+    rng = random.Random(seed)
+    per_day = sessions_per_day(count)
+    for i in range(count):
+        questions = rng.randint(5, 60)
+        total = questions * rng.uniform(40, 200)
+        yield {
+            'session_num': i + 1,
+            'subject': rng.choice(('Physics', 'Chemistry', 'Maths')),
+            'date': (FIRST_DAY + timedelta(days=i // per_day)).isoformat(),
+            'total_time_taken': total,
+            'avg_time_per_q': total / questions,
+            'bonus_at_end': rng.uniform(0, 300),
+            'total_questions_in_session': questions,
+        }
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def point_main_at(data_dir):
+    """Redirects main.py's storage constants into the benchmark directory."""
+    main.BONUS_POOL_FILE = os.path.join(data_dir, "bonus_pool.pkl")
+    main.SESSION_DATA_FILE = os.path.join(data_dir, "session_data.csv")
+    main.SESSION_LOG_DIR = os.path.join(data_dir, "session_log")
+    main.DAILY_QUESTIONS_TRACKER_FILE = os.path.join(data_dir, "daily_questions_tracker.pkl")
+    main.ROLLUPS_FILE = os.path.join(data_dir, "rollups.json")
+    main.STATE_DB_FILE = os.path.join(data_dir, "qimer_state.db")
+
+
+def build_history(data_dir, count):
+    session_log = SessionLog(main.SESSION_LOG_DIR)
+    store = SQLiteStateStore(main.STATE_DB_FILE)
+    rollups = RollupStore(main.ROLLUPS_FILE)
+    rollups.load()
+    for batch in batched(synthetic_sessions(count), GENERATE_BATCH):
+        session_log.append_many(batch)
+        with store._conn:
+            store._insert_sessions(batch)
+        for session in batch:
+            rollups._fold(session) # Same update as record_session, saved once at the end
+    rollups.save()
+    store.close()
+    main.save_bonus_pool_to_file(42.0)
+    main.save_daily_questions_tracker(date.today().isoformat(), 120, [100])
+
+
+def new_session(num, day):
+    return {'session_num': num, 'subject': 'Maths', 'date': day, 'total_time_taken': 1800.0,
+            'avg_time_per_q': 60.0, 'bonus_at_end': 12.5, 'total_questions_in_session': 30}
+
+
+# --- Measurement helpers ---
+def timed(fn, repeats=1):
+    """Best wall time of `repeats` calls, in seconds."""
+    best = None
+    for _ in range(repeats):
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory_mb(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def latencies_ms(fn, count):
+    samples = []
+    for i in range(count):
+        started = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2], samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+
+
+def size_mb(*paths):
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            for entry in os.scandir(path):
+                total += entry.stat().st_size
+        elif os.path.exists(path):
+            total += os.path.getsize(path)
+    return total / 1e6
+
+
+# --- Storage paths ---
+def measure_file(results, count, appends, load):
+    key = f"file@{count}"
+    results[f"{key}.size"] = (size_mb(main.SESSION_LOG_DIR), 'MB')
+    if load:
+        repeats = 3 if count <= 100000 else 1
+        results[f"{key}.load"] = (timed(main.load_session_data_from_csv, repeats), 's')
+        results[f"{key}.load_peak"] = (peak_memory_mb(main.load_session_data_from_csv), 'MB')
+    results[f"{key}.next_session_num"] = (timed(main.get_next_session_num, 5) * 1000, 'ms')
+    day = last_day(count)
+    p50, p95 = latencies_ms(lambda i: main.save_session_data_to_csv(new_session(count + i + 1, day)), appends)
+    results[f"{key}.append_p50"] = (p50, 'ms')
+    results[f"{key}.append_p95"] = (p95, 'ms')
+
+
+def measure_sqlite(results, count, appends, load):
+    key = f"sqlite@{count}"
+    store = SQLiteStateStore(main.STATE_DB_FILE)
+    try:
+        results[f"{key}.size"] = (size_mb(main.STATE_DB_FILE, main.STATE_DB_FILE + "-wal"), 'MB')
+        if load:
+            repeats = 3 if count <= 100000 else 1
+            results[f"{key}.load"] = (timed(store.load_sessions, repeats), 's')
+            results[f"{key}.load_peak"] = (peak_memory_mb(store.load_sessions), 'MB')
+        results[f"{key}.next_session_num"] = (timed(store.next_session_num, 5) * 1000, 'ms')
+        day = last_day(count)
+        p50, p95 = latencies_ms(lambda i: store.commit_session_end(day, 30 * (i + 1), [], new_session(count + i + 1, day), 12.5), appends)
+        results[f"{key}.append_p50"] = (p50, 'ms')
+        results[f"{key}.append_p95"] = (p95, 'ms')
+    finally:
+        store.close()
+
+
+def measure_rollups(results, count, appends):
+    key = f"rollups@{count}"
+    results[f"{key}.size"] = (size_mb(main.ROLLUPS_FILE), 'MB')
+    rollups = RollupStore(main.ROLLUPS_FILE)
+    results[f"{key}.load"] = (timed(rollups.load), 's')
+    day = last_day(count, extra_days=1)
+    p50, p95 = latencies_ms(lambda i: rollups.record_session(new_session(count + 10 ** 9 + i, day)), appends)
+    results[f"{key}.append_p50"] = (p50, 'ms')
+    results[f"{key}.append_p95"] = (p95, 'ms')
+
+
+def measure_pickles(results, appends):
+    today = date.today().isoformat()
+    for name, fn in (("bonus_pool.load", lambda i: main.load_bonus_pool_from_file()),
+                     ("bonus_pool.save", lambda i: main.save_bonus_pool_to_file(float(i))),
+                     ("daily_tracker.load", lambda i: main.load_daily_questions_tracker()),
+                     ("daily_tracker.save", lambda i: main.save_daily_questions_tracker(today, i, [100]))):
+        p50, p95 = latencies_ms(fn, appends)
+        results[f"pickles.{name}_p50"] = (p50, 'ms')
+        results[f"pickles.{name}_p95"] = (p95, 'ms')
+
+
+def run_scale(count, appends, max_load_rows, keep_dir=None):
+    results = {}
+    data_dir = tempfile.mkdtemp(prefix=f"qimer-persist-{count}-", dir=keep_dir)
+    try:
+        point_main_at(data_dir)
+        started = time.perf_counter()
+        build_history(data_dir, count)
+        print(f"  generated {count} sessions in {time.perf_counter() - started:.1f} s", flush=True)
+        load = count <= max_load_rows
+        measure_file(results, count, appends, load)
+        measure_sqlite(results, count, appends, load)
+        measure_rollups(results, count, appends)
+        if not load:
+            print(f"  full loads skipped above --max-load-rows {max_load_rows}")
+    finally:
+        if keep_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+# --- Baselines ---
+def compare(results, baseline, tolerance):
+    """Returns the metrics that got worse than tolerance x baseline (beyond the noise floor)."""
+    regressions = []
+    for name, (value, unit) in sorted(results.items()):
+        if name not in baseline or name.endswith(UNGATED_SUFFIXES):
+            continue
+        base = baseline[name][0]
+        if value > base * tolerance and value - base > ABSOLUTE_SLACK.get(unit, 0.0):
+            regressions.append(f"{name}: {value:.3f} {unit} vs baseline {base:.3f} {unit} ({value / base if base else float('inf'):.2f}x)")
+    return regressions
+
+
+def print_results(results):
+    for name, (value, unit) in sorted(results.items(), key=lambda item: (item[0].split('.')[0].split('@')[0], item[0])):
+        print(f"{name:<40} {value:>12.3f} {unit}")
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Qimer's persistence layer at growing history sizes.")
+    parser.add_argument('--scales', help="Comma-separated session counts (default 1000,10000,100000).")
+    parser.add_argument('--full', action='store_true', help="Use 1k to 10M sessions (needs several GB of RAM and disk).")
+    parser.add_argument('--appends', type=int, default=50, help="Writes measured per storage path (default 50).")
+    parser.add_argument('--max-load-rows', type=int, default=2000000,
+                        help="Skip full-history loads above this many sessions (default 2000000).")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file.")
+    parser.add_argument('--save-baseline', action='store_true', help="Write these results as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="Allowed slowdown/growth vs the baseline (default 1.5x).")
+    parser.add_argument('--keep-data', help="Generate the histories under this directory and keep them.")
+    args = parser.parse_args(argv)
+
+    scales = FULL_SCALES if args.full else DEFAULT_SCALES
+    if args.scales:
+        scales = [int(s) for s in args.scales.split(',') if s.strip()]
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="qimer-persist-pickles-") as pickle_dir:
+        point_main_at(pickle_dir)
+        main.save_bonus_pool_to_file(42.0)
+        main.save_daily_questions_tracker(date.today().isoformat(), 120, [100])
+        measure_pickles(results, max(args.appends, 1))
+    for count in scales:
+        print(f"Scale {count} sessions:", flush=True)
+        results.update(run_scale(count, max(args.appends, 1), args.max_load_rows, args.keep_data))
+
+    print()
+    print_results(results)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, indent=1, sort_keys=True)
+        print(f"\nBaseline saved to '{args.baseline}'.")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at '{args.baseline}'; run with --save-baseline on this machine to create one.")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} persistence regressions (> {args.tolerance}x baseline):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions against '{args.baseline}' (tolerance {args.tolerance}x).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,143 @@
+"""Startup benchmark: import time of main.py and time until the first prompt.
+
+Usage (from the repository root):
+    python benchmarks/bench_startup.py [--runs 15] [--sessions 20000] [--backend file|sqlite]
+
+Every run is a fresh interpreter against a synthetic history in a temporary
+directory, so results are reproducible across machines and checkouts:
+
+  import main        `python -X importtime -c "import main"`, cumulative time of main
+  first prompt       process launch -> subject prompt printed
+  history ready      process launch -> "Questions completed today" printed, with the
+                     prompts answered as soon as they appear (the background
+                     load has to finish before that line can be shown)
+"""
+import argparse
+import os
+import pickle
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from session_log import SessionLog
+
+PROMPT_ANSWERS = [("M for Maths): ", "p\n"), ("'q' to quit): ", "1\n"), ("(in minutes): ", "1\n")]
+HISTORY_READY = "INFO: Questions completed today so far"
+
+CHILD_SCRIPT = """
+import sys
+sys.path.insert(0, {repo!r})
+import main
+main.BONUS_POOL_FILE = {bonus!r}
+main.SESSION_DATA_FILE = {legacy!r}
+main.SESSION_LOG_DIR = {log_dir!r}
+main.DAILY_QUESTIONS_TRACKER_FILE = {tracker!r}
+main.STORAGE_BACKEND = {backend!r}
+main.STATE_DB_FILE = {db!r}
+main.CHECKPOINT_FILE = {checkpoint!r}
+main.run_question_timer()
+"""
+
+
+def make_history(data_dir, num_sessions, seed=1):
+    """Writes a session log, bonus pool and daily tracker like a long-time user's."""
+    rng = random.Random(seed)
+    sessions = []
+    for i in range(num_sessions):
+        day = 1 + i * 3 // 4 # A few sessions a day, spread over the years
+        year, day_of_year = 2020 + day // 360, day % 360
+        total = rng.uniform(600, 5400)
+        count = rng.randint(10, 60)
+        sessions.append({
+            'session_num': i + 1,
+            'subject': rng.choice(['Physics', 'Chemistry', 'Maths']),
+            'date': f"{year:04d}-{day_of_year // 30 + 1:02d}-{day_of_year % 30 + 1:02d}",
+            'total_time_taken': total,
+            'avg_time_per_q': total / count,
+            'bonus_at_end': rng.uniform(0, 300),
+            'total_questions_in_session': count,
+        })
+    SessionLog(os.path.join(data_dir, "session_log")).append_many(sessions)
+    with open(os.path.join(data_dir, "bonus_pool.pkl"), 'wb') as f:
+        pickle.dump(123.4, f)
+    with open(os.path.join(data_dir, "daily_questions_tracker.pkl"), 'wb') as f:
+        pickle.dump({'date': '2020-01-01', 'count': 40, 'celebrated_levels': []}, f)
+
+
+def measure_import(runs):
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                                cwd=REPO_DIR, capture_output=True, text=True, check=True)
+        match = re.search(r"\|\s*(\d+) \| main$", result.stderr, re.MULTILINE)
+        samples.append(int(match.group(1)) / 1e6)
+    return samples
+
+
+def measure_prompts(runs, data_dir, backend):
+    child = CHILD_SCRIPT.format(
+        repo=REPO_DIR,
+        bonus=os.path.join(data_dir, "bonus_pool.pkl"),
+        legacy=os.path.join(data_dir, "missing.csv"),
+        log_dir=os.path.join(data_dir, "session_log"),
+        tracker=os.path.join(data_dir, "daily_questions_tracker.pkl"),
+        backend=backend,
+        db=os.path.join(data_dir, "qimer_state.db"),
+        checkpoint=os.path.join(data_dir, "session_checkpoint.bin"),
+    )
+    first_prompt, history_ready = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, "-u", "-c", child], stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=0)
+        output = ""
+        prompt_seen = False
+        pending = list(PROMPT_ANSWERS) # Answered in order; then the loaded history is shown
+        while HISTORY_READY not in output:
+            char = proc.stdout.read(1)
+            if not char:
+                raise RuntimeError(f"Qimer exited before printing the history line:\n{output}")
+            output += char
+            if pending and output.endswith(pending[0][0]):
+                if not prompt_seen:
+                    first_prompt.append(time.perf_counter() - started)
+                    prompt_seen = True
+                proc.stdin.write(pending.pop(0)[1])
+        history_ready.append(time.perf_counter() - started)
+        proc.kill()
+        proc.wait()
+        proc.stdin.close()
+        proc.stdout.close()
+    return first_prompt, history_ready
+
+
+def report(label, samples):
+    print(f"{label:<16} median {statistics.median(samples) * 1000:8.1f} ms   "
+          f"min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Qimer's import time and time to first prompt.")
+    parser.add_argument('--runs', type=int, default=15, help="Fresh interpreters per measurement (default 15).")
+    parser.add_argument('--sessions', type=int, default=20000, help="Sessions in the synthetic history (default 20000).")
+    parser.add_argument('--backend', choices=['file', 'sqlite'], default='file')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="qimer-startup-") as data_dir:
+        make_history(data_dir, args.sessions)
+        print(f"Python {sys.version.split()[0]}, {args.runs} runs, {args.sessions} past sessions, {args.backend} backend")
+        report("import main", measure_import(args.runs))
+        first_prompt, history_ready = measure_prompts(args.runs, data_dir, args.backend)
+        report("first prompt", first_prompt)
+        report("history ready", history_ready)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import os
+import sys
+import threading
+import time
+
+# --- ANSI control sequences (no `cls`/`clear` subprocesses) ---
+CURSOR_HOME_AND_CLEAR = "\x1b[H\x1b[2J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+SKIP_HINT = "(Press Enter to skip)"
+
+_ansi_enabled = False
+
+
+def enable_ansi():
+    """Turns on ANSI escape handling in the Windows console (a no-op elsewhere)."""
+    global _ansi_enabled
+    if _ansi_enabled or os.name != 'nt':
+        _ansi_enabled = True
+        return
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11) # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004) # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+    except (AttributeError, OSError):
+        pass
+    _ansi_enabled = True
+
+
+def _compose(art_lines, messages, art_indent="         ", message_indent="     ", gap="\n"):
+    """Builds one full-screen frame as a single string."""
+    text = "\n\n\n"
+    text += "".join(f"{art_indent}{line}\n" for line in art_lines)
+    text += gap
+    text += "".join(f"{message_indent}{msg}\n" for msg in messages)
+    text += f"\n\n\n{message_indent}{SKIP_HINT}\n"
+    return CURSOR_HOME_AND_CLEAR + text
+
+
+# --- Pre-built frame sets for each goal tier ---
+def small_celebration_frames(goal_value):
+    """Two frames, 0.5 s each."""
+    message = f"CONGRATS! {goal_value} QUESTIONS ACHIEVED!"
+    frames = [_compose([art], [message], gap="") for art in ("   🎉   ", "  ✨🎉✨ ")]
+    return frames, 0.5, None
+
+
+def bigger_celebration_frames(goal_value):
+    """Four frames shown twice, 0.4 s each."""
+    messages = [
+        "MASSIVE CONGRATULATIONS!",
+        f"You hit {goal_value} questions today!",
+        "Keep crushing it!"
+    ]
+    arts = ["   🌟🌟   ", "  ✨🎉✨  ", " ✨🎉🎉✨ ", "  ✨🎉✨  "]
+    frames = [_compose([art], messages, gap="") for art in arts] * 2 # Repeat animation a few times
+    return frames, 0.4, None
+
+
+def very_big_celebration_frames(goal_value):
+    """Two alternating frames, 0.5 s each, looping for ~1 minute."""
+    celebration_art = [
+        " _^_   _^_ ",
+        "//_\\\\_//_\\\\",
+        "|-----|-----|",
+        "| 🎉 | 🎉 |",
+        "|-----|-----|",
+        "\\___///___/",
+        "  \\_/   \\_/"
+    ]
+    alt_art = [
+        "  * * ",
+        " * * * * ",
+        " * CONGRATS! * ",
+        "  * * "
+    ]
+    messages = [
+        "!!!! UNBELIEVABLE ACCOMPLISHMENT !!!!",
+        f"YOU COMPLETED {goal_value} QUESTIONS TODAY!",
+        "THIS IS TRULY REMARKABLE. TAKE A MOMENT TO CELEBRATE YOUR DEDICATION!",
+        "Your consistency is inspiring. What's next?"
+    ]
+    frames = [_compose(art, messages, art_indent="        ", message_indent="    ") for art in (celebration_art, alt_art)]
+    return frames, 0.5, 60
+
+
+class CelebrationRenderer:
+    """Plays pre-built frames on a background thread; stop() skips the rest immediately.
+
+    Frames are complete strings that start with an ANSI clear, so each redraw is
+    a single write with no subprocess. Without a duration the frames play once;
+    with one they loop until it has elapsed.
+    """
+
+    def __init__(self, frames, frame_delay, duration=None, closing_text="", out=None):
+        self.frames = frames
+        self.frame_delay = frame_delay
+        self.duration = duration
+        self.closing_text = closing_text
+        self.out = out or sys.stdout
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts rendering in the background and returns at once."""
+        enable_ansi()
+        self._thread = threading.Thread(target=self._run, name="celebration", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Skips the rest of the animation and waits for the screen to be restored."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def length_seconds(self):
+        """How long the animation plays when it isn't skipped."""
+        return self.duration if self.duration is not None else len(self.frames) * self.frame_delay
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _write(self, text):
+        self.out.write(text)
+        self.out.flush()
+
+    def _run(self):
+        start_time = time.monotonic()
+        frame_index = 0
+        self._write(HIDE_CURSOR)
+        try:
+            while not self._stop.is_set():
+                if self.duration is None:
+                    if frame_index >= len(self.frames):
+                        break
+                elif time.monotonic() - start_time >= self.duration:
+                    break
+                self._write(self.frames[frame_index % len(self.frames)])
+                frame_index += 1
+                self._stop.wait(self.frame_delay) # Wakes early when skipped
+        finally:
+            self._write(CURSOR_HOME_AND_CLEAR + SHOW_CURSOR + "\n" + self.closing_text)
+
+
+def celebration_for_goal(goal_value, tier):
+    """Returns an unstarted renderer for tier 1 (small), 2 (bigger) or 3 (very big)."""
+    builders = {1: small_celebration_frames, 2: bigger_celebration_frames, 3: very_big_celebration_frames}
+    frames, frame_delay, duration = builders[tier](goal_value)
+    closing_text = f"CONGRATULATIONS! You've completed {goal_value} questions today!\n"
+    return CelebrationRenderer(frames, frame_delay, duration, closing_text)
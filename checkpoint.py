@@ -0,0 +1,216 @@
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from array import array
+
+from atomic_file import atomic_write
+
+# --- Fixed-size checkpoint file of the session in progress ---
+# [0, 128)       two 64-byte header copies: position, bonus pool, limit epoch and time into the current
+#                segment, generation, CRC32; writes alternate so a torn one leaves the other intact
+# [128, 1024)    session info as JSON (subject, limits, daily count...), written once
+# [1024, ...)    two 56-byte slot copies per question, alternated like the header, each with its own
+#                generation and CRC32; all-zero copies were never written (untouched questions)
+MAGIC = b"QIMERCKP"
+VERSION = 3
+HEADER = struct.Struct('<8sIQqdqdII') # magic, version, generation, current question, bonus pool, epoch, segment elapsed, info length, info CRC
+SLOT = struct.Struct('<QddqdqI') # generation, then QuestionSession.slot_state: spent, remaining, remaining epoch, limit, limit epoch, flags
+CRC = struct.Struct('<I')
+HEADER_SIZE = HEADER.size + CRC.size
+HEADER_OFFSETS = (0, 64)
+SLOT_SIZE = SLOT.size + CRC.size
+SLOT_PAIR_SIZE = 2 * SLOT_SIZE
+INFO_OFFSET = 128
+SLOTS_OFFSET = 1024
+EMPTY_SLOT = bytes(SLOT_SIZE)
+FLUSH_INTERVAL_SECONDS = 5.0 # Most progress a power cut can lose; after a crash the page cache still has every write
+
+
+def _with_crc(body):
+    return body + CRC.pack(zlib.crc32(body))
+
+
+class SessionCheckpoint:
+    """Keeps the session in progress resumable after a crash, Ctrl+C or power cut.
+
+    The file is memory-mapped and has a fixed size: a header plus one slot per
+    question. tick() rewrites only the header (the time spent in the current
+    segment) and sync() writes only the slots of questions whose state changed,
+    so each update is a few dozen bytes copied into the page cache. The header
+    and every slot alternate between two copies with a rising generation
+    number, so a write torn by a power cut still leaves the previous copy
+    readable. The map is flushed to disk at most every FLUSH_INTERVAL_SECONDS,
+    never per tick. With no path every method returns immediately.
+    """
+
+    def __init__(self, path, clock=time.monotonic):
+        self.path = path
+        self.clock = clock
+        self._file = None
+        self._map = None
+        self._info = b""
+        self._generation = 0
+        self._slot_generations = array('Q')
+        self._last_flush = 0.0
+
+    def create(self, session, info, say=print):
+        """Starts the checkpoint file for `session` (atomically replacing any old one). Returns True if it is active."""
+        if self.path is None:
+            return False
+        self._info = json.dumps(info, separators=(',', ':')).encode('utf-8')
+        self._generation = 0
+        self._slot_generations = array('Q', bytes(8 * session.num_questions))
+        try:
+            if INFO_OFFSET + len(self._info) > SLOTS_OFFSET:
+                raise ValueError("session info too long")
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with atomic_write(self.path, 'w+b') as f:
+                f.truncate(SLOTS_OFFSET + SLOT_PAIR_SIZE * session.num_questions) # Sparse zeros: untouched questions cost nothing
+                with mmap.mmap(f.fileno(), 0) as tmp_map:
+                    tmp_map[INFO_OFFSET:INFO_OFFSET + len(self._info)] = self._info
+                    self._write(tmp_map, session, session.resume_elapsed)
+                    tmp_map.flush()
+            self._file = open(self.path, 'r+b')
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            self._last_flush = self.clock()
+            return True
+        except (IOError, OSError, ValueError) as e:
+            self.close()
+            say(f"Error creating session checkpoint '{self.path}': {e}. This session can't be resumed after a crash.")
+            return False
+
+    def _write(self, target, session, elapsed):
+        for index in session.take_changes():
+            generation = self._slot_generations[index] = self._slot_generations[index] + 1
+            offset = SLOTS_OFFSET + index * SLOT_PAIR_SIZE + (generation % 2) * SLOT_SIZE # Never overwrite the newest good copy
+            target[offset:offset + SLOT_SIZE] = _with_crc(SLOT.pack(generation, *session.slot_state(index)))
+        self._write_header(target, session, elapsed)
+
+    def _write_header(self, target, session, elapsed):
+        self._generation += 1
+        offset = HEADER_OFFSETS[self._generation % 2] # Never overwrite the newest good copy
+        target[offset:offset + HEADER_SIZE] = _with_crc(HEADER.pack(
+            MAGIC, VERSION, self._generation, session.current_question_num, session.bonus_pool,
+            session.epoch, elapsed, len(self._info), zlib.crc32(self._info)))
+
+    def _flush_if_due(self):
+        now = self.clock()
+        if now - self._last_flush >= FLUSH_INTERVAL_SECONDS:
+            self._map.flush()
+            self._last_flush = now
+
+    def tick(self, session, elapsed):
+        """Per countdown iteration: records the time spent in the current segment (header only)."""
+        if self._map is None:
+            return
+        self._write_header(self._map, session, elapsed)
+        self._flush_if_due()
+
+    def sync(self, session, elapsed=0.0):
+        """After an action: writes the changed questions' slots, then the header."""
+        if self._map is None:
+            return
+        self._write(self._map, session, elapsed)
+        self._flush_if_due()
+
+    def close(self):
+        """Unmaps the file and leaves it in place (the session can still be resumed)."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """The session has been saved: removes the checkpoint so it isn't offered again."""
+        active = self._map is not None
+        self.close()
+        if active:
+            discard_checkpoint(self.path)
+
+
+def discard_checkpoint(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _newest_header(data):
+    """Unpacks the valid header copy with the highest generation, or raises ValueError."""
+    headers = []
+    for offset in HEADER_OFFSETS:
+        copy = data[offset:offset + HEADER_SIZE]
+        if len(copy) == HEADER_SIZE and copy == _with_crc(copy[:HEADER.size]):
+            headers.append(HEADER.unpack(copy[:HEADER.size]))
+    if not headers:
+        raise ValueError("header checksum mismatch")
+    return max(headers, key=lambda header: header[2])
+
+
+def _newest_slot(pair):
+    """slot_state() from the valid copy with the highest generation; None if neither copy is readable."""
+    copies = []
+    for offset in (0, SLOT_SIZE):
+        copy = pair[offset:offset + SLOT_SIZE]
+        if copy != EMPTY_SLOT and copy == _with_crc(copy[:SLOT.size]):
+            copies.append(SLOT.unpack(copy[:SLOT.size]))
+    return max(copies)[1:] if copies else None
+
+
+def load_checkpoint(path, say=print):
+    """Reads an interrupted session's checkpoint.
+
+    Returns its session info plus 'session', a QuestionSession restored to the
+    last tick, or None if there is no checkpoint. A damaged file is renamed to
+    <path>.damaged so it isn't offered again.
+    """
+    if path is None or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < SLOTS_OFFSET:
+            raise ValueError("file too short")
+        magic, version, _, current_question_num, bonus_pool, epoch, segment_elapsed, info_len, info_crc = _newest_header(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a checkpoint of this version")
+        info_bytes = data[INFO_OFFSET:INFO_OFFSET + info_len]
+        if zlib.crc32(info_bytes) != info_crc:
+            raise ValueError("session info checksum mismatch")
+        info = json.loads(info_bytes)
+        num_questions = info['num_questions']
+        if len(data) != SLOTS_OFFSET + SLOT_PAIR_SIZE * num_questions:
+            raise ValueError("unexpected file size")
+        slots, unreadable = [], []
+        empty_pair = bytes(SLOT_PAIR_SIZE)
+        for index in range(num_questions):
+            offset = SLOTS_OFFSET + index * SLOT_PAIR_SIZE
+            pair = data[offset:offset + SLOT_PAIR_SIZE]
+            if pair == empty_pair:
+                continue
+            state = _newest_slot(pair)
+            if state is None: # The question's first write was torn: it had no earlier state to fall back to
+                unreadable.append(index + 1)
+                continue
+            slots.append((index, state))
+        if unreadable:
+            say(f"Warning: The saved state of question(s) {', '.join(map(str, unreadable))} was damaged; they resume as not started.")
+        from session_core import QuestionSession
+        session = QuestionSession.from_slots(num_questions, bonus_pool, current_question_num, epoch, slots)
+        session.resume_elapsed = segment_elapsed
+    except (IOError, OSError, ValueError, KeyError, TypeError, IndexError, struct.error) as e:
+        say(f"Found an interrupted session in '{path}' but could not read it ({e}). It was moved to '{path}.damaged'.")
+        try:
+            os.replace(path, path + ".damaged")
+        except OSError:
+            pass
+        return None
+    info['session'] = session
+    return info
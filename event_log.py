@@ -0,0 +1,87 @@
+import collections
+import csv
+import os
+import threading
+import time
+
+EVENT_FIELDNAMES = ['session_num', 'monotonic_time', 'event', 'question_num', 'bonus_delta']
+
+
+class QuestionEventLog:
+    """Per-question event recorder with a background, batched writer.
+
+    record() only appends a tuple to an in-memory ring buffer, so the timer
+    loop never waits on the disk. A writer thread drains the buffer in batches
+    to an append-only CSV file, either every `flush_interval` seconds or as soon
+    as `batch_size` events are waiting. If the writer falls more than
+    `capacity` events behind, the oldest unsaved events are dropped and counted.
+    With `path` set to None nothing is recorded.
+    """
+
+    def __init__(self, path, session_num, capacity=4096, batch_size=256, flush_interval=1.0, clock=time.monotonic):
+        self.path = path
+        self.session_num = session_num
+        self.clock = clock
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = collections.deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self.dropped = 0
+        self.written = 0
+
+    def start(self):
+        """Starts the background writer thread."""
+        if self.path is None:
+            return
+        self._thread = threading.Thread(target=self._writer_loop, name="question-event-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, event, question_num, bonus_delta=0.0):
+        """Records one event. Never blocks on I/O."""
+        if self.path is None:
+            return
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1 # deque drops the oldest entry on append
+        self._buffer.append((self.session_num, self.clock(), event, question_num, bonus_delta))
+        if len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def close(self):
+        """Stops the writer after it has flushed everything still buffered."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _writer_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._flush()
+            if self._stopping and not self._buffer:
+                break
+
+    def _flush(self):
+        """Writes every buffered event to the log file in one batch."""
+        batch = []
+        while self._buffer:
+            try:
+                batch.append(self._buffer.popleft())
+            except IndexError:
+                break
+        if not batch:
+            return
+
+        file_exists = os.path.exists(self.path)
+        try:
+            with open(self.path, mode='a', newline='', encoding='utf-8') as file:
+                writer = csv.writer(file)
+                if not file_exists:
+                    writer.writerow(EVENT_FIELDNAMES)
+                writer.writerows((s, f"{t:.6f}", e, q, f"{d:.3f}") for s, t, e, q, d in batch)
+            self.written += len(batch)
+        except IOError as e:
+            print(f"\nError writing question events to '{self.path}': {e}")
@@ -0,0 +1,114 @@
+import queue
+import threading
+import time
+
+# --- Keys the question timer reacts to ---
+ACTION_KEYS = ('space', 'a', 'p', 'r')
+DEBOUNCE_SECONDS = 0.15 # Minimum gap between two accepted presses of the same key
+
+
+class KeyEvent:
+    """A single accepted key press, stamped with the time the hook saw it."""
+
+    def __init__(self, name, timestamp):
+        self.name = name
+        self.timestamp = timestamp
+
+
+class KeyInputEngine:
+    """Event-driven key input built on keyboard hooks instead of is_pressed polling.
+
+    The hook callback runs on the keyboard library's listener thread and only
+    pushes accepted presses into a queue. The timer thread blocks on that queue
+    with a timeout, so it wakes up either on a key event or on its next display
+    deadline and never busy-waits.
+    """
+
+    def __init__(self, keys=ACTION_KEYS, debounce_seconds=DEBOUNCE_SECONDS):
+        self.keys = set(keys)
+        self.debounce_seconds = debounce_seconds
+        self._events = queue.Queue()
+        self._last_accepted = {} # key name -> timestamp of the last accepted press
+        self._held_keys = set() # Keys currently held down (ignores OS auto-repeat)
+        self._lock = threading.Lock()
+        self._paused = False
+        self._hook = None
+        self.latencies = [] # Seconds from key press to the timer acting on it
+
+    def start(self):
+        """Installs the keyboard hook."""
+        import keyboard
+        self._hook = keyboard.hook(self._on_key_event)
+
+    def stop(self):
+        """Removes the keyboard hook."""
+        if self._hook is not None:
+            import keyboard
+            try:
+                keyboard.unhook(self._hook)
+            except (KeyError, ValueError):
+                pass
+            self._hook = None
+
+    def _on_key_event(self, event):
+        """Hook callback: filters, debounces and queues key presses."""
+        name = event.name
+        if name not in self.keys:
+            return
+        timestamp = getattr(event, 'time', None) or time.time()
+
+        with self._lock:
+            if event.event_type == 'up':
+                self._held_keys.discard(name)
+                return
+            if name in self._held_keys: # Auto-repeat while the key is held down
+                return
+            self._held_keys.add(name)
+            if self._paused:
+                return
+
+            last = self._last_accepted.get(name)
+            if last is not None and timestamp - last < self.debounce_seconds:
+                return
+            self._last_accepted[name] = timestamp
+
+        self._events.put(KeyEvent(name, timestamp))
+
+    def wait_for_key(self, timeout):
+        """Blocks until a key event arrives or `timeout` seconds pass. Returns None on timeout."""
+        try:
+            return self._events.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            return None
+
+    def mark_handled(self, key_event):
+        """Records the keypress-to-action latency for a handled event."""
+        self.latencies.append(max(time.time() - key_event.timestamp, 0.0))
+
+    def pause(self):
+        """Stops accepting key presses (e.g. while input() reads a line)."""
+        with self._lock:
+            self._paused = True
+
+    def resume(self):
+        """Accepts key presses again, discarding anything queued while paused."""
+        with self._lock:
+            self._paused = False
+            self._held_keys.clear()
+        self.clear()
+
+    def clear(self):
+        """Drops all queued, unhandled key events."""
+        while True:
+            try:
+                self._events.get_nowait()
+            except queue.Empty:
+                break
+
+    def latency_summary(self):
+        """Returns (count, average, p95, max) keypress latency in seconds, or None if nothing was handled."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        p95_index = min(int(round(0.95 * (len(ordered) - 1))), len(ordered) - 1)
+        return len(ordered), sum(ordered) / len(ordered), ordered[p95_index], ordered[-1]
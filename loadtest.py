@@ -0,0 +1,147 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+# Key mix sent by the simulated students
+KEY_WEIGHTS = {'space': 6, 'a': 1, 'p': 2, 'r': 1}
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 JSON client on asyncio streams."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.lock = asyncio.Lock() # One request at a time per connection
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, body=None):
+        async with self.lock:
+            return await self._request(method, path, body)
+
+    async def _request(self, method, path, body):
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        payload = json.loads(await self.reader.readexactly(length)) if length else None
+        return status, payload
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    return ordered[min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+async def count_events(host, port, session_id, stop, counter):
+    """Subscribes to a session's event stream and counts pushed updates."""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    writer.write(f"GET /sessions/{session_id}/events HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    try:
+        while not stop.is_set():
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b"data:"):
+                counter[0] += 1
+    finally:
+        writer.close()
+
+
+async def student(conn, session_id, stop, rng, key_interval, latencies, errors):
+    """Presses random keys on one session until told to stop."""
+    keys, weights = zip(*KEY_WEIGHTS.items())
+    while not stop.is_set():
+        await asyncio.sleep(rng.expovariate(1.0 / key_interval))
+        key = rng.choices(keys, weights)[0]
+        body = {'key': key, 'limit_minutes': rng.choice([1, 2, 3])} if key == 'r' else {'key': key}
+        started = time.perf_counter()
+        status, _payload = await conn.request('POST', f"/sessions/{session_id}/keys", body)
+        latencies.append(time.perf_counter() - started)
+        if status == 409: # Session finished: start a fresh one
+            status, payload = await conn.request('POST', "/sessions", {'questions': 30, 'limit_minutes': 2})
+            session_id = payload['id']
+        elif status != 200:
+            errors[0] += 1
+
+
+async def run_load_test(host, port, sessions, connections, duration, key_interval, subscribers, seed):
+    rng = random.Random(seed)
+    stop = asyncio.Event()
+    latencies, errors, pushes = [], [0], [0]
+
+    setup_started = time.perf_counter()
+    conns = [HttpConnection(host, port) for _ in range(max(min(connections, sessions), 1))]
+    for conn in conns:
+        await conn.open()
+    session_ids = []
+    for i in range(sessions):
+        _status, payload = await conns[i % len(conns)].request('POST', "/sessions", {'questions': 30, 'limit_minutes': 2})
+        session_ids.append(payload['id'])
+    print(f"Created {sessions} sessions over {len(conns)} connections in {time.perf_counter() - setup_started:.2f} s")
+
+    tasks = [asyncio.create_task(student(conns[i % len(conns)], sid, stop, random.Random(rng.random()), key_interval, latencies, errors))
+             for i, sid in enumerate(session_ids)]
+    tasks += [asyncio.create_task(count_events(host, port, sid, stop, pushes)) for sid in session_ids[:subscribers]]
+
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.sleep(0.2)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    for conn in conns:
+        conn.close() # Requests cancelled mid-flight leave these unusable
+    conn = HttpConnection(host, port)
+    await conn.open()
+    _status, totals = await conn.request('GET', "/sessions")
+    conn.close()
+    print(f"Server reports {totals['sessions']} sessions ({totals['active']} active)")
+
+    ordered = sorted(latencies)
+    print(f"Key presses: {len(ordered)} in {duration:.0f} s ({len(ordered) / duration:.0f}/s), errors: {errors[0]}")
+    print(f"Latency p50 {percentile(ordered, 50) * 1000:.2f} ms  p99 {percentile(ordered, 99) * 1000:.2f} ms  "
+          f"max {percentile(ordered, 100) * 1000:.2f} ms")
+    print(f"Countdown pushes received by {min(subscribers, sessions)} subscribers: {pushes[0]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test a running `python main.py serve` instance.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--sessions', type=int, default=1000, help="Concurrent simulated students (default 1000).")
+    parser.add_argument('--connections', type=int, default=200, help="Keep-alive connections shared by the students (default 200).")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run (default 30).")
+    parser.add_argument('--key-interval', type=float, default=5.0, help="Mean seconds between key presses per student (default 5).")
+    parser.add_argument('--subscribers', type=int, default=100, help="How many sessions also get an event stream (default 100).")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    asyncio.run(run_load_test(args.host, args.port, args.sessions, args.connections, args.duration, args.key_interval, args.subscribers, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,20 @@
-import time
-import keyboard
-from playsound import playsound
 import os
-import pickle
-import csv
-from datetime import datetime
+import sys
+from background import BackgroundCall
+from storage import StateStore
+from session_io import SystemClock, KeyboardInput, ConsoleOutput
+# pickle, sqlite3, the session log, event log, timing metrics and the session core
+# are imported where they are first used, so the subject prompt appears right
+# away while history loads in the background (see benchmarks/bench_startup.py).
 
 # --- Global constants for file operations ---
 BONUS_POOL_FILE = "E:\\Coding\\Python\\Programs\\Qimer\\bonus_pool.pkl"
-SESSION_DATA_FILE = "E:\\Coding\\Python\\Programs\\Qimer\\session_data.csv"
+SESSION_DATA_FILE = "E:\\Coding\\Python\\Programs\\Qimer\\session_data.csv" # Legacy flat history, imported into the log once
+SESSION_LOG_DIR = "E:\\Coding\\Python\\Programs\\Qimer\\session_log"
 DAILY_QUESTIONS_TRACKER_FILE = "E:\\Coding\\Python\\Programs\\Qimer\\daily_questions_tracker.pkl"
+ROLLUPS_FILE = "E:\\Coding\\Python\\Programs\\Qimer\\rollups.json" # Per-day/week/subject totals, streaks, goal history
+QUESTION_EVENTS_FILE = "E:\\Coding\\Python\\Programs\\Qimer\\question_events.csv"
+TIMER_METRICS_FILE = "E:\\Coding\\Python\\Programs\\Qimer\\qimer_timer.prom" # Prometheus textfile format
 SOUND_FILE_PATH = "E:\\Coding\\Python\\Programs\\Qimer\\tick.wav" # User-defined path
 
 # --- Daily Question Goals (VARIABLE NAMES CHANGED) ---
@@ -17,12 +22,39 @@ GOAL_1 = 100
 GOAL_2 = 200
 GOAL_3 = 300
 
+# --- Timer display ---
+STATUS_LINE_MAX_REFRESH_HZ = 10 # Countdown only changes at 0.1 s resolution
+TIMING_METRICS_ENABLED = False # Opt-in loop/jitter/drift instrumentation, written to TIMER_METRICS_FILE
+TRACE_ENABLED = False # Opt-in Chrome trace / Perfetto timeline of each session, written once at the end
+TRACE_DIR = "E:\\Coding\\Python\\Programs\\Qimer\\traces" # One session_<n>.json per traced session
+
+# --- Crash recovery: the session in progress is checkpointed to a memory-mapped file and offered for resume ---
+CHECKPOINT_ENABLED = True
+CHECKPOINT_FILE = "E:\\Coding\\Python\\Programs\\Qimer\\session_checkpoint.bin" # Removed once the session is saved
+
+# --- Side timers, run next to the question countdown (None = off) ---
+STUDY_BLOCK_MINUTES = None # One-off "study block is over" alert
+BREAK_REMINDER_MINUTES = None # Repeating reminder to take a break
+
+# --- Storage backend: "file" (pickles + session log) or "sqlite" (single transactional database) ---
+STORAGE_BACKEND = "file"
+STATE_DB_FILE = "E:\\Coding\\Python\\Programs\\Qimer\\qimer_state.db"
+
+def dump_pickle_atomically(path, obj):
+    """Pickles to a temp file and renames it over `path`, so a crash never leaves a half-written file."""
+    import pickle
+    from atomic_file import atomic_write
+    with atomic_write(path, 'wb') as f:
+        pickle.dump(obj, f)
+
 # --- Helper functions for loading/saving bonus pool (remains pickle) ---
-def load_bonus_pool_from_file():
-    """Loads the bonus time from a file."""
-    if os.path.exists(BONUS_POOL_FILE):
+def load_bonus_pool_from_file(path=None):
+    """Loads the bonus time from a file (BONUS_POOL_FILE unless another path is given)."""
+    import pickle
+    path = path or BONUS_POOL_FILE
+    if os.path.exists(path):
         try:
-            with open(BONUS_POOL_FILE, 'rb') as f:
+            with open(path, 'rb') as f:
                 content = pickle.load(f)
                 if isinstance(content, (int, float)): # Ensure loaded content is a number
                     return float(content)
@@ -34,19 +66,22 @@ def load_bonus_pool_from_file():
     return 0.0
 
 def save_bonus_pool_to_file(amount):
-    """Saves the current bonus time to a file."""
+    """Saves the current bonus time to a file. Returns True on success."""
     try:
-        with open(BONUS_POOL_FILE, 'wb') as f:
-            pickle.dump(float(amount), f) # Ensure it's saved as a float
+        dump_pickle_atomically(BONUS_POOL_FILE, float(amount)) # Ensure it's saved as a float
+        return True
     except IOError as e:
         print(f"Error saving bonus pool to file: {e}")
+        return False
 
 # --- Updated Helper functions for Daily Questions Tracker ---
-def load_daily_questions_tracker():
-    """Loads daily question count, last recorded date, and celebrated levels."""
-    if os.path.exists(DAILY_QUESTIONS_TRACKER_FILE):
+def load_daily_questions_tracker(path=None):
+    """Loads daily question count, last recorded date, and celebrated levels (from DAILY_QUESTIONS_TRACKER_FILE by default)."""
+    import pickle
+    path = path or DAILY_QUESTIONS_TRACKER_FILE
+    if os.path.exists(path):
         try:
-            with open(DAILY_QUESTIONS_TRACKER_FILE, 'rb') as f:
+            with open(path, 'rb') as f:
                 data = pickle.load(f)
                 # Ensure data is a dictionary and has expected keys. Add 'celebrated_levels' if missing for old files.
                 if isinstance(data, dict) and 'date' in data and 'count' in data:
@@ -55,450 +90,530 @@ def load_daily_questions_tracker():
                     return data
                 else:
                     print(f"Warning: Unexpected data format in daily tracker file. Resetting.")
-        except (EOFError, pickle.UnpackingError, IOError) as e: # Corrected UnpicklingError to UnpackingError for consistency
+        except (EOFError, pickle.UnpicklingError, IOError) as e:
             print(f"Error loading daily questions tracker: {e}. Starting fresh.")
     return {'date': None, 'count': 0, 'celebrated_levels': []} # Default empty state with new key
 
 def save_daily_questions_tracker(date, count, celebrated_levels):
-    """Saves the current daily question count, date, and celebrated levels."""
+    """Saves the current daily question count, date, and celebrated levels. Returns True on success."""
     try:
-        with open(DAILY_QUESTIONS_TRACKER_FILE, 'wb') as f:
-            pickle.dump({'date': date, 'count': count, 'celebrated_levels': celebrated_levels}, f)
+        dump_pickle_atomically(DAILY_QUESTIONS_TRACKER_FILE, {'date': date, 'count': count, 'celebrated_levels': celebrated_levels})
+        return True
     except IOError as e:
         print(f"Error saving daily questions tracker: {e}")
-
-# Functions for session data (CSV)
-def load_session_data_from_csv():
-    """Loads all past session data from a CSV file."""
+        return False
+
+# Functions for session data (segmented CSV log)
+def open_session_log():
+    """Opens the segmented session log, importing the old flat CSV on first use."""
+    from session_log import SessionLog
+    session_log = SessionLog(SESSION_LOG_DIR)
+    if not session_log.exists() and os.path.exists(SESSION_DATA_FILE):
+        imported = session_log.import_legacy_csv(SESSION_DATA_FILE)
+        print(f"INFO: Imported {imported} past sessions from '{SESSION_DATA_FILE}' into the session log.")
+    return session_log
+
+def load_session_data_from_csv(log_dir=None, legacy_csv=None):
+    """Loads all past session data from the session log.
+
+    Given another data directory's log and/or flat CSV, reads those instead,
+    without importing or writing anything (used by the batch report).
+    """
+    from session_log import SessionLog, iter_session_csv
     sessions = []
-    if os.path.exists(SESSION_DATA_FILE):
-        try:
-            with open(SESSION_DATA_FILE, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    # Convert string values back to their original types
-                    try:
-                        row['session_num'] = int(row.get('session_num', 0))
-                        row['total_time_taken'] = float(row.get('total_time_taken', 0.0))
-                        row['avg_time_per_q'] = float(row.get('avg_time_per_q', 0.0))
-                        row['bonus_at_end'] = float(row.get('bonus_at_end', 0.0))
-                        row['total_questions_in_session'] = int(row.get('total_questions_in_session', 0)) 
-                        sessions.append(row)
-                    except ValueError as ve:
-                        print(f"Warning: Skipping malformed row in CSV: {row} - {ve}")
-        except FileNotFoundError:
-            print(f"No existing session data CSV file found at '{SESSION_DATA_FILE}'. Starting fresh.")
-        except Exception as e: # Catch other potential CSV reading errors
-            print(f"Error reading session data CSV file: {e}. Starting with empty session data.")
+    try:
+        if log_dir is None and legacy_csv is None:
+            sessions = list(open_session_log().iter_sessions())
+        elif log_dir is not None and SessionLog(log_dir).exists():
+            sessions = list(SessionLog(log_dir).iter_sessions())
+        elif legacy_csv is not None and os.path.exists(legacy_csv):
+            sessions = list(iter_session_csv(legacy_csv))
+    except Exception as e: # Catch other potential CSV reading errors
+        print(f"Error reading session data CSV file: {e}. Starting with empty session data.")
     return sessions
 
+def get_next_session_num():
+    """Returns the number for the next session in O(1) from the log manifest."""
+    try:
+        return open_session_log().next_session_num()
+    except (IOError, ValueError) as e:
+        print(f"Error reading session log index: {e}. Numbering this session as 1.")
+        return 1
+
 def save_session_data_to_csv(session_data_dict):
-    """Saves a single session's data to the CSV file, appending it."""
-    fieldnames = ['session_num', 'subject', 'date', 'total_time_taken', 'avg_time_per_q', 'bonus_at_end', 'total_questions_in_session']
-    
-    file_exists = os.path.exists(SESSION_DATA_FILE)
-    
+    """Saves a single session's data to the session log, appending it to this month's segment. Returns True on success."""
     try:
-        with open(SESSION_DATA_FILE, mode='a', newline='', encoding='utf-8') as file:
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            
-            if not file_exists:
-                writer.writeheader() # Write header only if file is new
-            
-            writer.writerow(session_data_dict) # Write the new session's data
-            
+        session_log = open_session_log()
+        segments_before = len(session_log.manifest()['segments'])
+        if not session_log.append(session_data_dict): # Write the new session's data
+            return False
     except IOError as e:
         print(f"Error saving session data to CSV file: {e}")
+        return False
     except Exception as e:
         print(f"An unexpected error occurred while writing to CSV: {e}")
+        return False
+    if len(session_log.manifest()['segments']) > segments_before:
+        try:
+            session_log.compress_old_segments() # New month started; older segments are read-only now
+        except IOError as e:
+            print(f"Error compressing old session log segments: {e}") # The session itself is saved
+    return True
+
+# --- Pluggable state storage ---
+class FileStateStore(StateStore):
+    """The original file backend: two pickles plus the segmented session CSV log."""
+
+    def load_bonus_pool(self):
+        return load_bonus_pool_from_file()
+
+    def save_bonus_pool(self, amount):
+        save_bonus_pool_to_file(amount)
+
+    def load_daily_tracker(self):
+        return load_daily_questions_tracker()
+
+    def next_session_num(self):
+        return get_next_session_num()
+
+    def load_sessions(self):
+        return load_session_data_from_csv()
+
+    def session_csv_paths(self, export_dir):
+        return open_session_log().segment_paths() # Already CSV; nothing to export
+
+    def commit_session_end(self, date, daily_count, celebrated_levels, session_data_dict, bonus_pool):
+        # Three separate files: each write is atomic on its own, but not as a group. All three are attempted;
+        # the session only counts as saved (and its checkpoint is deleted) if every one succeeded.
+        results = [save_daily_questions_tracker(date, daily_count, celebrated_levels),
+                   save_session_data_to_csv(session_data_dict),
+                   save_bonus_pool_to_file(bonus_pool)]
+        return all(results)
+
+def open_state_store():
+    """Opens the configured storage backend, importing the old files into SQLite the first time."""
+    if STORAGE_BACKEND == "sqlite":
+        import sqlite3
+        from sqlite_store import SQLiteStateStore
+        try:
+            store = SQLiteStateStore(STATE_DB_FILE)
+            store.import_from(FileStateStore())
+            return store
+        except sqlite3.Error as e:
+            print(f"Error opening state database '{STATE_DB_FILE}': {e}. Falling back to file storage.")
+    return FileStateStore()
+
+# --- Incremental rollups (daily/weekly/subject totals, streaks, goal history) ---
+def open_rollups(state_store):
+    """Opens the rollup file, building it from the session history the first time."""
+    from rollups import RollupStore
+    rollups = RollupStore(ROLLUPS_FILE)
+    rollups.load()
+    if rollups.needs_rebuild: # First run, or a file from an older version
+        try:
+            rollups.rebuild(state_store.load_sessions(), (GOAL_1, GOAL_2, GOAL_3))
+        except IOError as e:
+            print(f"Error building rollups from session history: {e}")
+    return rollups
 
-# --- Tiered Animation Functions ---
-def clear_screen():
-    """Clears the console screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
-
-def animate_small_celebration(goal_value):
-    """Plays a small console-based celebration animation."""
-    frames = [
-        "   🎉   ",
-        "  ✨🎉✨ "
-    ]
-    message = f"CONGRATS! {goal_value} QUESTIONS ACHIEVED!"
-    
-    clear_screen()
-    print("\n\n")
-    print("         " + frames[0])
-    print(f"     {message}")
-    print("\n\n")
-    time.sleep(0.5)
-    clear_screen()
-    print("\n\n")
-    print("         " + frames[1])
-    print(f"     {message}")
-    print("\n\n")
-    time.sleep(0.5)
-    clear_screen()
-    print("\n") # Reset cursor for next prints
-
-def animate_bigger_celebration(goal_value):
-    """Plays a bigger console-based celebration animation."""
-    frames = [
-        "   🌟🌟   ",
-        "  ✨🎉✨  ",
-        " ✨🎉🎉✨ ",
-        "  ✨🎉✨  "
-    ]
-    messages = [
-        "MASSIVE CONGRATULATIONS!",
-        f"You hit {goal_value} questions today!",
-        "Keep crushing it!"
-    ]
-    
-    for _ in range(2): # Repeat animation a few times
-        for frame in frames:
-            clear_screen()
-            print("\n\n")
-            print("         " + frame)
-            for msg in messages:
-                print(f"     {msg}")
-            print("\n\n")
-            time.sleep(0.4)
-    clear_screen()
-    print("\n")
-
-def animate_very_big_celebration(goal_value):
-    """Plays a very big console-based celebration animation, lasting ~1 minute."""
-    
-    celebration_frames = [
-        " _^_   _^_ ",
-        "//_\\\\_//_\\\\",
-        "|-----|-----|",
-        "| 🎉 | 🎉 |",
-        "|-----|-----|",
-        "\\___///___/",
-        "  \\_/   \\_/"
-    ]
-    
-    alt_frames = [
-        "  * * ",
-        " * * * * ",
-        " * CONGRATS! * ",
-        "  * * "
-    ]
-
-    messages = [
-        "!!!! UNBELIEVABLE ACCOMPLISHMENT !!!!",
-        f"YOU COMPLETED {goal_value} QUESTIONS TODAY!",
-        "THIS IS TRULY REMARKABLE. TAKE A MOMENT TO CELEBRATE YOUR DEDICATION!",
-        "Your consistency is inspiring. What's next?"
-    ]
-    
-    start_time = time.time()
-    duration = 60 # seconds
-    frame_delay = 0.5 # seconds per frame
-
-    cycle_count = 0
-    while (time.time() - start_time) < duration:
-        clear_screen()
-        print("\n\n")
-
-        if cycle_count % 2 == 0: # Alternate between main celebration and simpler frames
-            for line in celebration_frames:
-                print(f"        {line}")
-        else:
-            for line in alt_frames:
-                print(f"        {line}")
-        
-        print("\n")
-        for msg in messages:
-            print(f"    {msg}")
-        print("\n\n")
-        
-        time.sleep(frame_delay)
-        cycle_count += 1
-
-    clear_screen()
-    print("\n")
+# --- Main application function ---
+def wait_for_enter(keys, prompt=""):
+    """Waits for Enter; at the end of input (EOF, e.g. a finished replay script) there is nothing to wait for."""
+    try:
+        keys.read_line(prompt)
+    except EOFError:
+        pass
+
+def load_startup_state(state_store):
+    """Reads what a session needs from storage; runs on a background thread during the prompts."""
+    state_store = state_store or open_state_store()
+    return {
+        'state_store': state_store,
+        'session_num': state_store.next_session_num(),
+        'daily_stats': state_store.load_daily_tracker(),
+        'last_session_bonus': state_store.load_bonus_pool(),
+    }
 
+def run_question_timer(clock=None, keys=None, output=None, state_store=None, record_events=True, instrument_timing=None, rollups=None, trace=None, checkpoint=None):
+    """Runs one timed session and returns its final state (None if the user quit at the prompts).
+
+    Clock, key input, output and storage are pluggable so the same state machine
+    can run live or headless against a virtual clock (see replay.py).
+    """
+    clock = clock or SystemClock()
+    keys = keys or KeyboardInput()
+    output = output or ConsoleOutput(SOUND_FILE_PATH, STATUS_LINE_MAX_REFRESH_HZ)
+    say = output.print
+
+    # --- Optional session timeline (events collected on actions only, exported at the end) ---
+    from trace_export import SessionTrace
+    trace = SessionTrace(TRACE_ENABLED if trace is None else trace, clock.monotonic)
+
+    say("Welcome to the Question Timer!")
+
+    # --- Storage, session number, daily tracker and bonus pool load while the user answers the prompts ---
+    startup = BackgroundCall(load_startup_state, state_store, name="startup-loader")
+
+    # --- Offer to resume a session that was interrupted by a crash, Ctrl+C or power cut ---
+    from checkpoint import SessionCheckpoint, load_checkpoint, discard_checkpoint
+    checkpoint_path = CHECKPOINT_FILE if (CHECKPOINT_ENABLED if checkpoint is None else checkpoint) else None
+    checkpoint = SessionCheckpoint(checkpoint_path, clock.monotonic)
+    resumed = load_checkpoint(checkpoint_path, say)
+    if resumed is not None:
+        say(f"\nINFO: Session {resumed['session_num']} ({resumed['subject']}, {resumed['num_questions']} questions) "
+            f"was interrupted at question {resumed['session'].current_question_num}.")
+        if keys.read_line("Resume it? (Y/n): ").strip().lower() == 'n':
+            discard_checkpoint(checkpoint_path)
+            resumed = None
+            say("Interrupted session discarded.")
+
+    if resumed is None:
+        # --- Input for Subject for the CURRENT session ---
+        prompts_started = clock.monotonic()
+        subject_map = {'p': 'Physics', 'c': 'Chemistry', 'm': 'Maths'}
+        selected_subject = None
+        while selected_subject is None:
+            subject_input = keys.read_line(f"\nEnter Subject (P for Physics, C for Chemistry, M for Maths): ").lower()
+            if subject_input in subject_map:
+                selected_subject = subject_map[subject_input]
+            else:
+                say("Invalid input. Please enter P, C, or M.")
 
-# --- Main application function ---
-def run_question_timer():
-    print("Welcome to the Question Timer!")
+        # --- Initial setup for number of questions and base time limit ---
+        while True:
+            try:
+                num_questions_str = keys.read_line("How many questions do you want to do? (Enter 'q' to quit): ")
+                if num_questions_str.lower() == 'q':
+                    say("Exiting timer. Goodbye!")
+                    startup.result()['state_store'].close()
+                    return None
+                num_questions = int(num_questions_str)
+                if num_questions <= 0:
+                    say("Please enter a positive number of questions.")
+                else:
+                    break
+            except ValueError:
+                say("Invalid input. Please enter a whole number or 'q'.")
 
-    # --- Load existing session data (kept for current_session_num calculation) ---
-    all_sessions_data = load_session_data_from_csv()
-    current_session_num = len(all_sessions_data) + 1
+        while True:
+            try:
+                time_limit_minutes_str = keys.read_line("Enter the base time limit for EACH question (in minutes): ")
+                time_limit_minutes = float(time_limit_minutes_str)
+                if time_limit_minutes <= 0:
+                    say("Please enter a positive time limit.")
+                else:
+                    time_limit = time_limit_minutes * 60 # Base time limit in seconds
+                    break
+            except ValueError:
+                say("Invalid input. Please enter a number for time.")
+        trace.blocking_since("Setup prompts", prompts_started)
+    else:
+        selected_subject = resumed['subject']
+        num_questions = resumed['num_questions']
+        time_limit_minutes = resumed['time_limit_minutes']
+        time_limit = time_limit_minutes * 60
+    
+    # --- Pick up the history loaded in the background (usually finished by now) ---
+    with trace.blocking("Wait for history load"):
+        loaded = startup.result()
+    state_store = loaded['state_store']
+    current_session_num = loaded['session_num'] if resumed is None else resumed['session_num'] # From the session log index, no history scan
 
     # --- Initialize bonus pool ---
     total_excess_time_seconds = 0.0 
 
-    # --- Load and update daily questions tracker ---
-    daily_stats = load_daily_questions_tracker()
-    current_date_str = datetime.now().strftime('%Y-%m-%d')
+    # --- Update daily questions tracker ---
+    daily_stats = loaded['daily_stats']
+    current_date_str = clock.today()
 
+    if resumed is not None: # As of the interrupted session's start; its questions are added at the end as usual
+        current_date_str = resumed['date']
+        daily_questions_completed_today = resumed['daily_count']
+        celebrated_levels = resumed['celebrated_levels']
     # If it's a new day, reset count and celebrated levels
-    if daily_stats['date'] != current_date_str:
+    elif daily_stats['date'] != current_date_str:
         daily_questions_completed_today = 0
         celebrated_levels = []
-        print(f"\nINFO: New day detected. Daily question count and celebration levels reset.")
+        say(f"\nINFO: New day detected. Daily question count and celebration levels reset.")
     else:
         daily_questions_completed_today = daily_stats['count']
         celebrated_levels = daily_stats['celebrated_levels']
     
-    print(f"INFO: Questions completed today so far: {daily_questions_completed_today}")
-
-    # --- Input for Subject for the CURRENT session ---
-    subject_map = {'p': 'Physics', 'c': 'Chemistry', 'm': 'Maths'}
-    selected_subject = None
-    while selected_subject is None:
-        subject_input = input(f"\nEnter Subject (P for Physics, C for Chemistry, M for Maths): ").lower()
-        if subject_input in subject_map:
-            selected_subject = subject_map[subject_input]
-        else:
-            print("Invalid input. Please enter P, C, or M.")
-
-    # --- Initial setup for number of questions and base time limit ---
-    while True:
-        try:
-            num_questions_str = input("How many questions do you want to do? (Enter 'q' to quit): ")
-            if num_questions_str.lower() == 'q':
-                print("Exiting timer. Goodbye!")
-                return
-            num_questions = int(num_questions_str)
-            if num_questions <= 0:
-                print("Please enter a positive number of questions.")
-            else:
-                break
-        except ValueError:
-            print("Invalid input. Please enter a whole number or 'q'.")
-
-    while True:
-        try:
-            time_limit_minutes_str = input("Enter the base time limit for EACH question (in minutes): ")
-            time_limit_minutes = float(time_limit_minutes_str)
-            if time_limit_minutes <= 0:
-                print("Please enter a positive time limit.")
-            else:
-                time_limit = time_limit_minutes * 60 # Base time limit in seconds
-                break
-        except ValueError:
-            print("Invalid input. Please enter a number for time.")
-    
-    # --- BONUS POOL HANDLING WITH keyboard.read_key() ---
-    last_session_bonus = load_bonus_pool_from_file()
-    if last_session_bonus > 0:
-        print(f"\nINFO: A bonus pool of {last_session_bonus:.1f} seconds was saved from your last session.")
-        print("Press 'x' NOW to load this bonus pool, or press any other key/Enter to start with an empty bonus pool.")
+    say(f"INFO: Questions completed today so far: {daily_questions_completed_today}")
+
+    # --- BONUS POOL HANDLING WITH keys.read_key() ---
+    last_session_bonus = loaded['last_session_bonus']
+    if resumed is not None:
+        say(f"Resuming with the interrupted session's bonus pool of {resumed['session'].bonus_pool:.1f} seconds.")
+    elif last_session_bonus > 0:
+        say(f"\nINFO: A bonus pool of {last_session_bonus:.1f} seconds was saved from your last session.")
+        say("Press 'x' NOW to load this bonus pool, or press any other key/Enter to start with an empty bonus pool.")
         
-        pressed_key = keyboard.read_key(suppress=False) 
+        with trace.blocking("Bonus pool prompt"):
+            pressed_key = keys.read_key() 
         
         if pressed_key == 'x':
             total_excess_time_seconds = last_session_bonus
-            save_bonus_pool_to_file(0.0) # Clear the file after loading to prevent accidental re-load
-            print(f"Bonus pool loaded! Starting this session with {total_excess_time_seconds:.1f} seconds bonus time.")
+            state_store.save_bonus_pool(0.0) # Clear the file after loading to prevent accidental re-load
+            say(f"Bonus pool loaded! Starting this session with {total_excess_time_seconds:.1f} seconds bonus time.")
         else:
-            print("Not loading saved bonus. Starting with an empty bonus pool.")
+            say("Not loading saved bonus. Starting with an empty bonus pool.")
     else:
-        print("No saved bonus pool found from previous sessions. Starting with an empty bonus pool.")
-    # --- END keyboard.read_key() BONUS POOL HANDLING ---
-
-    time.sleep(0.5) # Give a moment for message to display and key debounce
-
-    # --- Configuration for sound ---
-    question_states = []
-    for q_num in range(num_questions):
-        question_states.append({
-            'initial_limit': time_limit,         
-            'current_remaining': time_limit,     
-            'total_time_spent_on_this_q': 0      
-        })
-    
-    print(f"\n--- Starting Timer for {num_questions} Questions (Each {time_limit_minutes:.1f} minutes) ---")
-    print("Press SPACEBAR to **advance to the next question** and save remaining time to bonus pool.")
-    print("Press 'a' to **transfer all bonus time to the current question** (spends entire pool).")
-    print("Press 'p' to **move to the previous question** (adds bonus time if < 10s left).")
-    print("Press 'r' to **change the base time limit** for the remaining questions.")
-    print(f"Current Bonus Pool: {total_excess_time_seconds:.1f} seconds (updates below)") 
+        say("No saved bonus pool found from previous sessions. Starting with an empty bonus pool.")
+    # --- END keys.read_key() BONUS POOL HANDLING ---
 
-    current_question_num = 1 
-
-    # --- Main loop to manage navigation between questions ---
-    while current_question_num >= 1 and current_question_num <= num_questions:
-        q_index = current_question_num - 1 
-        current_q_data = question_states[q_index]
+    with trace.blocking("Start-up pause"):
+        clock.sleep(0.5) # Give a moment for message to display and key debounce
 
-        if current_q_data['current_remaining'] <= 0 and current_q_data['total_time_spent_on_this_q'] > 0:
-            current_question_num += 1
-            continue 
+    # --- Question state machine (navigation, bonus pool, re-limit) ---
+    from session_core import QuestionSession
+    if resumed is None:
+        session = QuestionSession(num_questions, time_limit, total_excess_time_seconds)
+    else:
+        session = resumed['session'] # Limits, time spent and bonus pool as of the last checkpoint tick
+    checkpoint.create(session, {
+        'session_num': current_session_num, 'subject': selected_subject, 'num_questions': num_questions,
+        'time_limit_minutes': time_limit_minutes, 'date': current_date_str,
+        'daily_count': daily_questions_completed_today, 'celebrated_levels': celebrated_levels,
+    }, say)
+    trace.counter('bonus_pool', session.bonus_pool)
+    
+    say(f"\n--- Starting Timer for {num_questions} Questions (Each {time_limit_minutes:.1f} minutes) ---")
+    say("Press SPACEBAR to **advance to the next question** and save remaining time to bonus pool.")
+    say("Press 'a' to **transfer all bonus time to the current question** (spends entire pool).")
+    say("Press 'p' to **move to the previous question** (adds bonus time if < 10s left).")
+    say("Press 'r' to **change the base time limit** for the remaining questions.")
+    say(f"Current Bonus Pool: {session.bonus_pool:.1f} seconds (updates below)") 
+
+    # --- Event-driven key input (replaces is_pressed polling) ---
+    keys.start()
+
+    # --- Optional timer accuracy instrumentation ---
+    from timing_metrics import TimerInstrumentation
+    if instrument_timing is None:
+        instrument_timing = TIMING_METRICS_ENABLED
+    timing = TimerInstrumentation(instrument_timing, clock, current_session_num)
+    timing.start()
+
+    # --- Per-question event log (buffered in memory, written by a background thread) ---
+    from event_log import QuestionEventLog
+    question_events = QuestionEventLog(QUESTION_EVENTS_FILE if record_events else None, current_session_num, clock=clock.monotonic)
+    question_events.start()
+
+    # --- Status line and tick sound (decoded once, played from memory on a worker thread) ---
+    output.open()
+
+    # --- Side timers share one deadline heap; the countdown's wait also ends at their next deadline ---
+    from scheduler import DeadlineScheduler
+    side_timers = DeadlineScheduler(clock.monotonic)
+    if STUDY_BLOCK_MINUTES:
+        side_timers.call_later(STUDY_BLOCK_MINUTES * 60, name="study-block",
+                               callback=lambda timer, early: say(f"\n*** Study block of {STUDY_BLOCK_MINUTES:g} minutes is over. Finish this question and take a break. ***"))
+    if BREAK_REMINDER_MINUTES:
+        side_timers.call_every(BREAK_REMINDER_MINUTES * 60, name="break-reminder",
+                               callback=lambda timer, early: say(f"\n*** {BREAK_REMINDER_MINUTES:g} minutes since your last break reminder: stretch and rest your eyes. ***"))
 
-        segment_start_time = time.time()
+    # --- Main loop to manage navigation between questions ---
+    while session.begin_segment(clock.now()):
+        current_question_num = session.current_question_num
+        current_q_data = session.current_state()
+        timing.segment_started()
+        trace.question_started(current_question_num, current_q_data['current_remaining'])
         
-        print(f"\n--- Question {current_question_num} ---")
-        print(f"Starting with: {current_q_data['current_remaining']:.1f} seconds remaining.")
+        say(f"\n--- Question {current_question_num} ---")
+        say(f"Starting with: {current_q_data['current_remaining']:.1f} seconds remaining.")
+        output.invalidate_status()
 
         action_taken_in_loop = None 
 
         # --- Inner loop for the current question's active timer segment ---
         while True:
-            elapsed_since_segment_start = time.time() - segment_start_time
-            remaining_for_this_question = current_q_data['current_remaining'] - elapsed_since_segment_start
+            timing.iteration()
+            now = clock.now()
+            remaining_for_this_question = session.remaining(now)
+            checkpoint.tick(session, session.elapsed(now)) # Header only; no flush per tick
+
+            if remaining_for_this_question <= 0:
+                output.show_status(current_question_num, num_questions, 0.0, session.bonus_pool, force=True)
+                action_taken_in_loop = 'timed_out'
+                question_events.record('timeout', current_question_num)
+                trace.instant('timeout', question=current_question_num)
+                session.time_out(now)
+                break 
+
+            output.show_status(current_question_num, num_questions, remaining_for_this_question, session.bonus_pool)
+
+            # Sleep until a key arrives or the next display refresh / timeout deadline
+            wait_seconds = remaining_for_this_question
+            if output.display_refresh_seconds is not None:
+                wait_seconds = min(output.display_refresh_seconds, remaining_for_this_question)
+            next_side_timer = side_timers.time_until_next()
+            if next_side_timer is not None:
+                wait_seconds = min(wait_seconds, next_side_timer)
+            timing.before_wait(wait_seconds)
+            key_event = keys.wait_for_key(wait_seconds)
+            timing.after_wait(key_event is not None)
+            if side_timers.run_due():
+                output.invalidate_status() # Reminders print on new lines
+            if key_event is None:
+                continue
+
+            now = clock.now()
+            keys.mark_handled(key_event)
+            output.invalidate_status() # Handlers below print on new lines
 
             # --- Handle input keys ---
-            if keyboard.is_pressed('a'):
-                if total_excess_time_seconds > 0:
-                    transfer_amount = total_excess_time_seconds
-                    current_q_data['current_remaining'] += transfer_amount 
-                    total_excess_time_seconds = 0 
-                    
-                    print(f"\nTransferred {transfer_amount:.1f} seconds! Question {current_question_num} now has {current_q_data['current_remaining']:.1f} seconds remaining. Current Bonus Pool: {total_excess_time_seconds:.1f}s")
+            if key_event.name == 'a':
+                transfer_amount = session.transfer_bonus()
+                if transfer_amount > 0:
+                    question_events.record('a', current_question_num, -transfer_amount)
+                    trace.instant('a', question=current_question_num, transferred=round(transfer_amount, 3))
+                    trace.counter('bonus_pool', session.bonus_pool)
+                    checkpoint.sync(session, session.elapsed(now))
+                    say(f"\nTransferred {transfer_amount:.1f} seconds! Question {current_question_num} now has {current_q_data['current_remaining']:.1f} seconds remaining. Current Bonus Pool: {session.bonus_pool:.1f}s")
                 else:
-                    print("\nNo excess time to transfer. Current Bonus Pool: 0.0s")
-                time.sleep(0.15) 
+                    question_events.record('a', current_question_num)
+                    trace.instant('a', question=current_question_num, transferred=0.0)
+                    say("\nNo excess time to transfer. Current Bonus Pool: 0.0s")
 
-            if keyboard.is_pressed('r'): 
-                current_q_data['current_remaining'] = remaining_for_this_question
-                current_q_data['total_time_spent_on_this_q'] += elapsed_since_segment_start
+            elif key_event.name == 'r': 
+                session.end_segment(now)
+                checkpoint.sync(session) # The prompt below can take a while
 
+                keys.pause() # Don't treat the typed time limit as timer keys
+                limit_prompt_started = clock.monotonic()
                 while True:
                     try:
-                        new_time_limit_minutes_str = input("\nEnter the new base time limit for the remaining questions (in minutes): ")
+                        new_time_limit_minutes_str = keys.read_line("\nEnter the new base time limit for the remaining questions (in minutes): ")
                         new_time_limit_minutes = float(new_time_limit_minutes_str)
                         if new_time_limit_minutes <= 0:
-                            print("Please enter a positive time limit.")
+                            say("Please enter a positive time limit.")
                         else:
                             new_time_limit = new_time_limit_minutes * 60 # Base time limit in seconds
                             break
                     except ValueError:
-                        print("Invalid input. Please enter a number for time.")
+                        say("Invalid input. Please enter a number for time.")
+                keys.resume()
+                trace.blocking_since("New limit prompt", limit_prompt_started)
                 
-                for i in range(current_question_num - 1, num_questions):
-                    question_states[i]['initial_limit'] = new_time_limit
-                    if i == (current_question_num - 1): 
-                        question_states[i]['current_remaining'] = min(question_states[i]['current_remaining'], new_time_limit)
-                    else: 
-                        question_states[i]['current_remaining'] = new_time_limit
-
-                print(f"Base time limit changed to {new_time_limit_minutes:.1f} minutes for the remaining questions.")
+                session.change_limit(new_time_limit)
+
+                question_events.record('r', current_question_num)
+                trace.instant('r', question=current_question_num, new_limit_minutes=new_time_limit_minutes)
+                say(f"Base time limit changed to {new_time_limit_minutes:.1f} minutes for the remaining questions.")
                 action_taken_in_loop = 'time_changed' 
-                time.sleep(0.15)
                 break 
 
-            if keyboard.is_pressed('p'):
+            elif key_event.name == 'p':
                 if current_question_num > 1:
-                    print("\n'p' pressed! Moving to previous question.")
-
-                    current_q_data['current_remaining'] = remaining_for_this_question
-                    current_q_data['total_time_spent_on_this_q'] += elapsed_since_segment_start
-
-                    prev_q_index = current_question_num - 2 
-                    prev_q_data = question_states[prev_q_index]
-
-                    if prev_q_data['current_remaining'] < 10:
-                        if total_excess_time_seconds > 0:
-                            transfer_amount = total_excess_time_seconds
-                            prev_q_data['current_remaining'] += transfer_amount 
-                            total_excess_time_seconds = 0 
-                            print(f"Question {current_question_num-1} had <10s left. Added {transfer_amount:.1f} seconds from bonus pool. Current Bonus Pool: {total_excess_time_seconds:.1f}s")
-                            print(f"Question {current_question_num-1} now has {prev_q_data['current_remaining']:.1f} seconds remaining.")
-                        else:
-                            print(f"Question {current_question_num-1} had <10s left, but bonus pool is empty. No time added. Current Bonus Pool: {total_excess_time_seconds:.1f}s")
+                    say("\n'p' pressed! Moving to previous question.")
+                    transfer_amount = session.go_back(now)
+                    prev_q_data = session.current_state()
+                    question_events.record('p', current_question_num, -transfer_amount if transfer_amount > 0 else 0.0)
+                    trace.instant('p', question=current_question_num, transferred=round(transfer_amount, 3))
+                    if transfer_amount > 0:
+                        trace.counter('bonus_pool', session.bonus_pool)
+
+                    if transfer_amount > 0:
+                        say(f"Question {current_question_num-1} had <10s left. Added {transfer_amount:.1f} seconds from bonus pool. Current Bonus Pool: {session.bonus_pool:.1f}s")
+                        say(f"Question {current_question_num-1} now has {prev_q_data['current_remaining']:.1f} seconds remaining.")
+                    elif prev_q_data['current_remaining'] < 10:
+                        say(f"Question {current_question_num-1} had <10s left, but bonus pool is empty. No time added. Current Bonus Pool: {session.bonus_pool:.1f}s")
                     else:
-                        print(f"Question {current_question_num-1} has {prev_q_data['current_remaining']:.1f} seconds left. Bonus time not added. Current Bonus Pool: {total_excess_time_seconds:.1f}s")
+                        say(f"Question {current_question_num-1} has {prev_q_data['current_remaining']:.1f} seconds left. Bonus time not added. Current Bonus Pool: {session.bonus_pool:.1f}s")
 
-                    current_question_num -= 1 
                     action_taken_in_loop = 'go_back'
-                    time.sleep(0.15) 
                     break 
                 else:
-                    print("\nAlready at the first question. Cannot go back.")
-                    time.sleep(0.15) 
+                    question_events.record('p', current_question_num)
+                    trace.instant('p', question=current_question_num, ignored=True)
+                    say("\nAlready at the first question. Cannot go back.")
 
-            if keyboard.is_pressed('space'):
-                current_q_data['current_remaining'] = remaining_for_this_question
-                current_q_data['total_time_spent_on_this_q'] += elapsed_since_segment_start
+            elif key_event.name == 'space':
+                remaining_for_this_question = session.skip(now)
+                question_events.record('space', current_question_num, max(remaining_for_this_question, 0.0))
+                trace.instant('space', question=current_question_num, banked=round(max(remaining_for_this_question, 0.0), 3))
+                trace.counter('bonus_pool', session.bonus_pool)
 
                 if remaining_for_this_question > 0:
-                    total_excess_time_seconds += remaining_for_this_question 
-                    print(f"\nSpacebar pressed! Skipping to next question. Added {remaining_for_this_question:.1f} seconds to Bonus Time Pool ({total_excess_time_seconds:.1f}s total).")
+                    say(f"\nSpacebar pressed! Skipping to next question. Added {remaining_for_this_question:.1f} seconds to Bonus Time Pool ({session.bonus_pool:.1f}s total).")
                 else:
-                    print("\nSpacebar pressed! Skipping to next question (no time left to save). Current Bonus Pool: {total_excess_time_seconds:.1f}s")
-                
-                current_q_data['current_remaining'] = 0.0 
+                    say(f"\nSpacebar pressed! Skipping to next question (no time left to save). Current Bonus Pool: {session.bonus_pool:.1f}s")
 
                 action_taken_in_loop = 'skipped_forward'
-                current_question_num += 1 
-                time.sleep(0.15) 
                 break
 
-            if remaining_for_this_question <= 0:
-                print(f"Time remaining: 0.0 seconds", end='\r')
-                action_taken_in_loop = 'timed_out'
-                
-                current_q_data['current_remaining'] = 0 
-                current_q_data['total_time_spent_on_this_q'] += elapsed_since_segment_start 
-                break 
-
-            print(f"Time remaining: {remaining_for_this_question:.1f} seconds", end='\r')
-            time.sleep(0.05) 
+        timing.segment_ended()
+        trace.question_ended(action_taken_in_loop)
+        checkpoint.sync(session)
 
         if action_taken_in_loop == 'timed_out':
-            print(f"\nTime's up for Question {current_question_num}!")
+            say(f"\nTime's up for Question {current_question_num}!")
 
         if action_taken_in_loop in ['skipped_forward', 'timed_out', 'go_back', 'time_changed']:
-            try:
-                playsound(SOUND_FILE_PATH)
-            except Exception as e:
-                print(f"Could not play sound: {e}")
-                print(f"Please ensure the file '{SOUND_FILE_PATH}' exists and playsound is installed correctly.")
+            with trace.blocking("Tick sound"):
+                output.tick() # Queued to the audio worker; never blocks the countdown
             
             if action_taken_in_loop == 'timed_out': 
-                 time.sleep(0.5)
+                with trace.blocking("Timeout pause"):
+                    clock.sleep(0.5)
             continue 
 
+    keys.stop()
+    output.close()
+    question_events.close()
+
     # --- End of main question loop ---
+    current_question_num = session.current_question_num
+    total_excess_time_seconds = session.bonus_pool
 
     if current_question_num > num_questions:
-        print("\nAll questions completed!")
+        say("\nAll questions completed!")
     elif current_question_num < 1: 
-        print("\nExiting timer (went back from first question).")
+        say("\nExiting timer (went back from first question).")
     
-    final_total_spent_seconds = sum(q_data['total_time_spent_on_this_q'] for q_data in question_states)
+    final_total_spent_seconds = session.total_time_spent()
 
     final_total_minutes = int(final_total_spent_seconds // 60)
     final_total_seconds = int(final_total_spent_seconds % 60)
-    print(f"\n--- Total time spent on questions: {final_total_minutes} minutes and {final_total_seconds} seconds ---")
+    say(f"\n--- Total time spent on questions: {final_total_minutes} minutes and {final_total_seconds} seconds ---")
     
     if total_excess_time_seconds > 0:
         excess_minutes = int(total_excess_time_seconds // 60)
         excess_seconds = int(total_excess_time_seconds % 60)
-        print(f"--- Remaining Bonus Time in Pool: {excess_minutes} minutes and {excess_seconds} seconds ---")
+        say(f"--- Remaining Bonus Time in Pool: {excess_minutes} minutes and {excess_seconds} seconds ---")
     else:
-        print("--- Bonus Time Pool is empty. ---")
+        say("--- Bonus Time Pool is empty. ---")
+
+    latency_stats = keys.latency_summary()
+    if latency_stats:
+        key_count, avg_latency, p95_latency, max_latency = latency_stats
+        say(f"--- Key response latency over {key_count} presses: avg {avg_latency * 1000:.1f} ms, p95 {p95_latency * 1000:.1f} ms, max {max_latency * 1000:.1f} ms ---")
+
+    timing.finish(final_total_spent_seconds, say, TIMER_METRICS_FILE)
 
     # --- Update Daily Questions Tracker at session end ---
+    questions_before_session = daily_questions_completed_today
     daily_questions_completed_today += num_questions # Add questions from this session
+    goals_reached = [goal for goal in (GOAL_1, GOAL_2, GOAL_3) if questions_before_session < goal <= daily_questions_completed_today]
 
     # Check for goal achievements in descending order to trigger the biggest one first
+    # (the animation itself runs after the session has been saved)
+    celebration = None
     if daily_questions_completed_today >= GOAL_3 and GOAL_3 not in celebrated_levels:
-        print(f"\n!!! DAILY QUESTION GOAL ({GOAL_3}) REACHED !!!")
-        animate_very_big_celebration(GOAL_3)
-        print(f"CONGRATULATIONS! You've completed {GOAL_3} questions today!")
+        say(f"\n!!! DAILY QUESTION GOAL ({GOAL_3}) REACHED !!!")
+        celebration = output.celebration(GOAL_3, 3)
         celebrated_levels.append(GOAL_3)
     elif daily_questions_completed_today >= GOAL_2 and GOAL_2 not in celebrated_levels:
-        print(f"\n!!! DAILY QUESTION GOAL ({GOAL_2}) REACHED !!!")
-        animate_bigger_celebration(GOAL_2)
-        print(f"CONGRATULATIONS! You've completed {GOAL_2} questions today!")
+        say(f"\n!!! DAILY QUESTION GOAL ({GOAL_2}) REACHED !!!")
+        celebration = output.celebration(GOAL_2, 2)
         celebrated_levels.append(GOAL_2)
     elif daily_questions_completed_today >= GOAL_1 and GOAL_1 not in celebrated_levels:
-        print(f"\n!!! DAILY QUESTION GOAL ({GOAL_1}) REACHED !!!")
-        animate_small_celebration(GOAL_1)
-        print(f"CONGRATULATIONS! You've completed {GOAL_1} questions today!")
+        say(f"\n!!! DAILY QUESTION GOAL ({GOAL_1}) REACHED !!!")
+        celebration = output.celebration(GOAL_1, 1)
         celebrated_levels.append(GOAL_1)
 
-    save_daily_questions_tracker(current_date_str, daily_questions_completed_today, celebrated_levels)
-    print(f"Daily questions completed: {daily_questions_completed_today}")
-    
-    # --- Save current session data to CSV ---
+    # --- Save current session data ---
     average_time_per_question = 0.0
     if num_questions > 0: 
         average_time_per_question = final_total_spent_seconds / num_questions
@@ -506,20 +621,102 @@ def run_question_timer():
     current_session_details = {
         'session_num': current_session_num,
         'subject': selected_subject,
-        'date': datetime.now().strftime('%Y-%m-%d'), 
+        'date': current_date_str, # The session's own day (the checkpoint's when resumed), same as the daily tracker
         'total_time_taken': final_total_spent_seconds,
         'avg_time_per_q': average_time_per_question,
         'bonus_at_end': total_excess_time_seconds,
         'total_questions_in_session': num_questions
     }
     
-    save_session_data_to_csv(current_session_details) 
-    print("Session details recorded successfully in CSV file.")
-
-    save_bonus_pool_to_file(total_excess_time_seconds)
-    print(f"Your final bonus pool amount ({total_excess_time_seconds:.1f} seconds) has been saved for your next session.")
+    # Daily tracker, session row and bonus pool are saved together in one commit
+    saved = state_store.commit_session_end(current_date_str, daily_questions_completed_today, celebrated_levels,
+                                           current_session_details, total_excess_time_seconds)
+    if saved:
+        checkpoint.finish() # Nothing left to resume
+        rollups = rollups or open_rollups(state_store)
+        if not rollups.rebuilt: # A rebuild just now read the history this session was committed to
+            try:
+                rollups.record_session(current_session_details, goals_reached) # O(1) update, no history scan
+            except IOError as e:
+                say(f"Error saving rollups to '{rollups.path}': {e}")
+    checkpoint.close() # Kept if the save failed, so the session can be resumed and saved again
+    state_store.close()
+
+    if celebration is not None:
+        with trace.blocking("Celebration animation", goal=celebrated_levels[-1]):
+            celebration.start()
+            keys.wait_for_enter(celebration.length_seconds()) # Ends early on Enter; everything is already saved
+            celebration.stop()
+
+    say(f"Daily questions completed: {daily_questions_completed_today}")
+    if saved:
+        say("Session details recorded successfully.")
+        say(f"Your final bonus pool amount ({total_excess_time_seconds:.1f} seconds) has been saved for your next session.")
+        say(f"Study streak: {rollups.current_streak(current_session_details['date'])} days (best {rollups.best_streak()})")
+    else:
+        say("Warning: The session could not be saved completely (see the errors above). If it was checkpointed, it will be offered for resuming next time.")
     
-    input("\nPress Enter to exit...")
+    trace_path = os.path.join(TRACE_DIR, f"session_{current_session_num}.json")
+    if trace.write(trace_path, current_session_num, say):
+        say(f"Session timeline written to '{trace_path}' (open it in ui.perfetto.dev).")
+
+    wait_for_enter(keys, "\nPress Enter to exit...")
+
+    return {
+        'question_states': session.question_states,
+        'bonus_pool': total_excess_time_seconds,
+        'daily_count': daily_questions_completed_today,
+        'celebrated_levels': celebrated_levels,
+        'session': current_session_details,
+    }
+
+# --- Command line entry points ---
+def run_stats():
+    """Runs `python main.py stats [options]` over the session log."""
+    try:
+        from stats import run_stats_command
+    except ImportError as e:
+        print(f"The stats command needs NumPy ({e}). Install it with 'pip install numpy'.")
+        return
+    state_store = open_state_store() # Reads the history from whichever backend is configured
+    try:
+        sources = state_store.session_csv_paths(os.path.join(SESSION_LOG_DIR, ".stats_export"))
+    finally:
+        state_store.close()
+    run_stats_command(sys.argv[2:], sources, os.path.join(SESSION_LOG_DIR, ".stats_cache"))
+
+def run_rollups():
+    """Runs `python main.py rollups`: daily goals, streaks and weekly/subject totals from the rollup file."""
+    state_store = open_state_store()
+    rollups = open_rollups(state_store)
+    state_store.close()
+    for line in rollups.summary_lines(SystemClock().today()):
+        print(line)
+
+def run_merge():
+    """Runs `python main.py merge OUTPUT INPUT...`: one deduplicated, renumbered history from several devices."""
+    from merge import run_merge_command
+    run_merge_command(sys.argv[2:])
+
+def run_report():
+    """Runs `python main.py report ROOT`: leaderboards over many students' data directories, on a process pool."""
+    from batch_report import run_report_command
+    run_report_command(sys.argv[2:])
+
+def run_replay():
+    """Runs `python main.py replay SCRIPT [options]` headlessly against a virtual clock."""
+    from replay import run_replay_command
+    run_replay_command(sys.argv[2:], run_question_timer)
+
+def run_server():
+    """Runs `python main.py serve [options]`: many timers on one asyncio loop behind a local HTTP API."""
+    from server import run_server_command
+    run_server_command(sys.argv[2:])
+
+COMMANDS = {'stats': run_stats, 'rollups': run_rollups, 'merge': run_merge, 'report': run_report, 'replay': run_replay, 'serve': run_server}
 
 if __name__ == "__main__":
-    run_question_timer()
\ No newline at end of file
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]]()
+    else:
+        run_question_timer()
\ No newline at end of file
@@ -0,0 +1,218 @@
+import argparse
+import csv
+import gzip
+import heapq
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from atomic_file import atomic_write
+from session_log import SESSION_FIELDNAMES, SessionLog, parse_session_row
+from sqlite_store import SQLiteStateStore, is_sqlite_file
+
+DEFAULT_CHUNK_ROWS = 200000 # Rows sorted in memory per run when an input needs an external sort
+MAX_MERGE_FAN_IN = 64 # Run files merged at once, and shared by the final merges of all inputs (Windows allows 512 open files)
+DEDUPE_FIELDS = [name for name in SESSION_FIELDNAMES if name != 'session_num'] # Same session, whatever device numbered it
+
+
+class MergeStats:
+    def __init__(self):
+        self.rows_read = 0
+        self.malformed = 0
+        self.duplicates = 0
+        self.rows_written = 0
+        self.sorted_externally = []
+
+
+def expand_inputs(paths, export_dir):
+    """Turns session log directories into their segment files and SQLite state databases into CSV
+    exported under `export_dir`; plain CSV/CSV.gz paths pass through."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(SessionLog(path).segment_paths()) # Oldest month first: one stream per log
+        elif is_sqlite_file(path): # A device using the SQLite backend keeps its history only there
+            store = SQLiteStateStore(path, read_only=True)
+            try:
+                export_path = os.path.join(export_dir, f"database-{len(files)}.csv")
+                store.export_sessions_csv(export_path)
+            finally:
+                store.close()
+            files.append(export_path)
+        else:
+            files.append(path)
+    return files
+
+
+def _open_csv(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    return opener(path, mode='rt', newline='', encoding='utf-8')
+
+
+def read_sessions(path, stats):
+    """Yields parsed sessions from one CSV, skipping malformed rows."""
+    with _open_csv(path) as file:
+        for row in csv.DictReader(file):
+            stats.rows_read += 1
+            try:
+                session = parse_session_row({name: row.get(name) for name in SESSION_FIELDNAMES})
+            except (TypeError, ValueError):
+                stats.malformed += 1
+                continue
+            if not session['date']:
+                stats.malformed += 1
+                continue
+            yield session
+
+
+def is_date_sorted(path):
+    """One streaming pass: True if the file's dates never go backwards."""
+    previous = ""
+    with _open_csv(path) as file:
+        for row in csv.DictReader(file):
+            date = row.get('date') or ""
+            if date < previous:
+                return False
+            previous = date
+    return True
+
+
+def _sorted_stream(path, stats):
+    """Yields (date, seq, session) for a date-sorted file without buffering it."""
+    for seq, session in enumerate(read_sessions(path, stats)):
+        yield session['date'], seq, session
+
+
+def _write_run(rows, temp_dir):
+    fd, run_path = tempfile.mkstemp(suffix=".csv", dir=temp_dir)
+    with os.fdopen(fd, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        for date, seq, session in rows:
+            writer.writerow([seq] + [session[name] for name in SESSION_FIELDNAMES])
+    return run_path
+
+
+def _read_run(run_path):
+    with open(run_path, 'r', newline='', encoding='utf-8') as file:
+        for record in csv.reader(file):
+            session = parse_session_row(dict(zip(SESSION_FIELDNAMES, record[1:])))
+            yield session['date'], int(record[0]), session
+
+
+def _merge_runs(run_paths, max_open, temp_dir):
+    """Merges run files, MAX_MERGE_FAN_IN at a time, into new runs until at most `max_open` are left."""
+    while len(run_paths) > max_open:
+        merged = []
+        for start in range(0, len(run_paths), MAX_MERGE_FAN_IN):
+            group = run_paths[start:start + MAX_MERGE_FAN_IN]
+            if len(group) == 1:
+                merged.append(group[0])
+                continue
+            merged.append(_write_run(heapq.merge(*(_read_run(run_path) for run_path in group)), temp_dir))
+            for run_path in group:
+                os.remove(run_path)
+        run_paths = merged
+    return run_paths
+
+
+def _externally_sorted_stream(path, stats, chunk_rows, temp_dir, max_open=MAX_MERGE_FAN_IN):
+    """Sorts a file of any size by (date, original position) with bounded memory.
+
+    Rows are sorted in chunks of `chunk_rows`, each chunk is written to a
+    temporary run file, and the runs are merged back with a heap. More than
+    `max_open` runs are first merged in intermediate passes, so the number of
+    open files stays bounded however large the input is.
+    """
+    run_paths = []
+    chunk = []
+    for row in _sorted_stream(path, stats): # Positions come from here; only the order is wrong
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            chunk.sort(key=lambda r: (r[0], r[1]))
+            run_paths.append(_write_run(chunk, temp_dir))
+            chunk = []
+    chunk.sort(key=lambda r: (r[0], r[1]))
+    if not run_paths: # Fits in one chunk: no need to touch the disk
+        yield from chunk
+        return
+    run_paths.append(_write_run(chunk, temp_dir))
+    chunk = None
+    run_paths = _merge_runs(run_paths, max_open, temp_dir)
+    yield from heapq.merge(*(_read_run(run_path) for run_path in run_paths))
+
+
+def _tag_source(stream, source):
+    """(date, source, position, session): ties are ordered by input, then by position within it."""
+    for date, seq, session in stream:
+        yield date, source, seq, session
+
+
+def merge_sessions(input_paths, output_path, chunk_rows=DEFAULT_CHUNK_ROWS, temp_dir=None):
+    """Merges session histories into one date-ordered CSV with fresh, unique session numbers.
+
+    Every input is read as a stream sorted by date (externally sorted first if
+    it isn't), the streams are combined with a k-way heap merge, and sessions
+    that appear on several devices are written once. Memory use stays constant
+    apart from the sessions of the day being merged.
+    """
+    stats = MergeStats()
+    work_dir = tempfile.mkdtemp(prefix="qimer-merge-", dir=temp_dir)
+    try:
+        files = expand_inputs(input_paths, work_dir)
+        unsorted = {path for path in files if not is_date_sorted(path)}
+        # Every unsorted input's final merge runs at the same time: they share the open-file budget
+        max_open = max(MAX_MERGE_FAN_IN // max(len(unsorted), 1), 1)
+        streams = []
+        for source, path in enumerate(files):
+            if path not in unsorted:
+                stream = _sorted_stream(path, stats)
+            else:
+                stats.sorted_externally.append(path)
+                stream = _externally_sorted_stream(path, stats, chunk_rows, work_dir, max_open)
+            streams.append(_tag_source(stream, source))
+
+        with atomic_write(output_path, 'w', newline='', encoding='utf-8') as out:
+            writer = csv.DictWriter(out, fieldnames=SESSION_FIELDNAMES)
+            writer.writeheader()
+            # Per day: how often each session was written, and seen so far per input. A session that
+            # one device recorded twice is kept twice; copies of it on other devices are dropped.
+            current_date, written_today, seen_today = None, {}, {}
+            for date, source, _seq, session in heapq.merge(*streams):
+                if date != current_date:
+                    current_date, written_today, seen_today = date, {}, {}
+                key = tuple(session[name] for name in DEDUPE_FIELDS)
+                seen = seen_today[key, source] = seen_today.get((key, source), 0) + 1
+                if seen <= written_today.get(key, 0):
+                    stats.duplicates += 1
+                    continue
+                written_today[key] = seen
+                stats.rows_written += 1
+                session['session_num'] = stats.rows_written
+                writer.writerow(session)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return stats
+
+
+# --- Command line entry point ---
+def run_merge_command(argv):
+    """Entry point for `python main.py merge OUTPUT INPUT [INPUT ...]`."""
+    parser = argparse.ArgumentParser(prog="main.py merge", description="Merge session histories from several devices into one CSV.")
+    parser.add_argument('output', help="Merged session CSV to write.")
+    parser.add_argument('inputs', nargs='+', help="Session CSV files (.csv or .csv.gz), session log directories or SQLite state databases.")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS,
+                        help=f"Rows sorted in memory per run for unsorted inputs (default {DEFAULT_CHUNK_ROWS}).")
+    parser.add_argument('--temp-dir', help="Where to put external-sort runs (default: system temp directory).")
+    args = parser.parse_args(argv)
+
+    try:
+        stats = merge_sessions(args.inputs, args.output, max(args.chunk_rows, 1), args.temp_dir)
+    except (IOError, sqlite3.Error) as e:
+        print(f"Error merging session histories: {e}")
+        return None
+    for path in stats.sorted_externally:
+        print(f"INFO: '{path}' was not in date order and was sorted externally.")
+    print(f"Read {stats.rows_read} rows, skipped {stats.malformed} malformed, dropped {stats.duplicates} duplicates.")
+    print(f"Wrote {stats.rows_written} sessions to '{args.output}', numbered 1-{stats.rows_written}.")
+    return stats
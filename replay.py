@@ -0,0 +1,317 @@
+import argparse
+import collections
+import csv
+import math
+import os
+import re
+import time
+from datetime import datetime
+
+from key_input import KeyEvent
+from rollups import RollupStore
+from session_log import SESSION_FIELDNAMES
+from storage import StateStore
+
+# --- Replay script format ---
+# One directive per line, '#' starts a comment. Times are relative to the moment the
+# question timer starts and accept "42", "42s", "2m", "1m30s" or "+5s" (after the previous key).
+#
+#   subject c            answer to the subject prompt
+#   questions 300        number of questions
+#   limit 3              base time limit per question, in minutes
+#   date 2025-06-18      session date (default: today)
+#   session 7            session number to use (default 1)
+#   bonus 120 x          saved bonus pool in seconds; 'x' loads it, anything else declines
+#   today 150 100        questions already done today, then levels already celebrated
+#   space at 42s         a key press: space, a, p or r
+#   r at 100s 3          'r' followed by the new limit in minutes
+#   repeat 300 space at +5s
+SCRIPT_KEYS = ('space', 'a', 'p', 'r')
+SCRIPT_SUBJECTS = ('p', 'c', 'm') # Same answers the subject prompt accepts
+_TIME_PATTERN = re.compile(r'^(?:(?P<m>\d+(?:\.\d+)?)m)?(?:(?P<s>\d+(?:\.\d+)?)s?)?$')
+
+
+class ScriptError(ValueError):
+    """Raised for malformed replay scripts."""
+
+
+def _positive(value, what):
+    if not value > 0:
+        raise ScriptError(f"{what} must be positive, got {value:g}")
+    return value
+
+
+def parse_time(text):
+    """Parses '42', '42s', '2m', '1m30s' into seconds."""
+    match = _TIME_PATTERN.match(text)
+    if not text or not match:
+        raise ScriptError(f"Invalid time '{text}'")
+    return float(match.group('m') or 0) * 60 + float(match.group('s') or 0)
+
+
+class ReplayScript:
+    """Parsed replay script: prompt answers plus timed key presses."""
+
+    def __init__(self):
+        self.subject = 'p'
+        self.questions = 1
+        self.limit_minutes = 1.0
+        self.date = datetime.now().strftime('%Y-%m-%d')
+        self.session_num = 1
+        self.saved_bonus = 0.0
+        self.bonus_key = ''
+        self.daily_count = 0
+        self.celebrated_levels = []
+        self.key_presses = [] # (seconds after timer start, key, argument)
+
+    @classmethod
+    def parse(cls, text):
+        script = cls()
+        last_time = 0.0
+        for line_num, raw_line in enumerate(text.splitlines(), 1):
+            words = raw_line.split('#', 1)[0].split()
+            if not words:
+                continue
+            try:
+                repeat = 1
+                if words[0] == 'repeat':
+                    repeat = int(words[1])
+                    words = words[2:]
+                directive = words[0]
+
+                if directive in SCRIPT_KEYS:
+                    if len(words) < 3 or words[1] != 'at':
+                        raise ScriptError(f"Expected '{directive} at <time>'")
+                    argument = words[3] if len(words) > 3 else None
+                    if directive == 'r':
+                        if argument is None:
+                            raise ScriptError("'r' needs the new time limit in minutes")
+                        _positive(float(argument), "The new time limit")
+                    for _ in range(repeat):
+                        if words[2].startswith('+'):
+                            last_time += parse_time(words[2][1:])
+                        else:
+                            last_time = parse_time(words[2])
+                        script.key_presses.append((last_time, directive, argument))
+                elif repeat != 1:
+                    raise ScriptError("Only key presses can be repeated")
+                elif directive == 'subject':
+                    if words[1].lower() not in SCRIPT_SUBJECTS:
+                        raise ScriptError(f"Subject must be one of {', '.join(SCRIPT_SUBJECTS)}, got '{words[1]}'")
+                    script.subject = words[1]
+                elif directive == 'questions':
+                    script.questions = _positive(int(words[1]), "The number of questions")
+                elif directive == 'limit':
+                    script.limit_minutes = _positive(float(words[1]), "The time limit")
+                elif directive == 'date':
+                    script.date = datetime.strptime(words[1], '%Y-%m-%d').strftime('%Y-%m-%d')
+                elif directive == 'session':
+                    script.session_num = int(words[1])
+                elif directive == 'bonus':
+                    script.saved_bonus = float(words[1])
+                    script.bonus_key = words[2] if len(words) > 2 else ''
+                elif directive == 'today':
+                    script.daily_count = int(words[1])
+                    script.celebrated_levels = [int(level) for level in words[2:]]
+                else:
+                    raise ScriptError(f"Unknown directive '{directive}'")
+            except (IndexError, ValueError) as e:
+                raise ScriptError(f"Line {line_num}: {e if isinstance(e, ScriptError) else raw_line.strip()}")
+        script.key_presses.sort(key=lambda press: press[0]) # Stable: same-time presses keep script order
+        return script
+
+
+# --- Headless backends ---
+class VirtualClock:
+    """A clock that only moves when the session waits or sleeps."""
+
+    def __init__(self, date, start=0.0):
+        self._now = start
+        self._date = date
+
+    def now(self):
+        return self._now
+
+    def monotonic(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self._now += max(seconds, 0.0)
+
+    def advance_to(self, timestamp):
+        self._now = max(self._now, timestamp)
+
+    def today(self):
+        return self._date
+
+
+class ScriptedInput:
+    """Feeds scripted prompt answers and key presses, advancing the virtual clock between them."""
+
+    def __init__(self, clock, script):
+        self.clock = clock
+        self._lines = collections.deque([script.subject, str(script.questions), str(script.limit_minutes)])
+        self._presses = collections.deque(script.key_presses)
+        self._bonus_key = script.bonus_key
+        self._start_time = 0.0
+
+    def start(self):
+        self._start_time = self.clock.now()
+
+    def stop(self):
+        pass
+
+    def pause(self):
+        pass
+
+    def resume(self):
+        pass
+
+    def wait_for_key(self, timeout):
+        now = self.clock.now()
+        deadline = now + max(timeout, 0.0)
+        if self._presses and self._start_time + self._presses[0][0] <= deadline:
+            at, key, argument = self._presses.popleft()
+            self.clock.advance_to(self._start_time + at)
+            if key == 'r':
+                self._lines.append(argument) # Answer for the "new base time limit" prompt
+            return KeyEvent(key, self.clock.now())
+        if deadline <= now: # Remaining time below float resolution: still make progress
+            deadline = math.nextafter(now, math.inf)
+        self.clock.advance_to(deadline)
+        return None
+
+    def mark_handled(self, key_event):
+        pass
+
+    def latency_summary(self):
+        return None
+
+    def read_key(self):
+        return self._bonus_key
+
+    def wait_for_enter(self, timeout):
+        self.clock.sleep(timeout) # Scripts never press Enter: the wait runs out
+        return False
+
+    def read_line(self, prompt=""):
+        if not self._lines: # Like input() at the end of stdin, rather than re-answering a prompt forever
+            raise EOFError(f"The replay script has no answer for the prompt {prompt.strip()!r}")
+        return self._lines.popleft()
+
+
+class NullOutput:
+    """Discards all output (or echoes messages when verbose); never redraws periodically."""
+
+    display_refresh_seconds = None
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def print(self, *args, **kwargs):
+        if self.verbose:
+            print(*args, **kwargs)
+
+    def show_status(self, question_num, num_questions, remaining, bonus_pool, force=False):
+        pass
+
+    def invalidate_status(self):
+        pass
+
+    def tick(self):
+        pass
+
+    def celebration(self, goal_value, tier):
+        return None
+
+
+class MemoryStateStore(StateStore):
+    """In-memory state seeded from the script; keeps what the session commits."""
+
+    def __init__(self, script):
+        self.bonus_pool = script.saved_bonus
+        self.tracker = {'date': script.date if script.daily_count else None,
+                        'count': script.daily_count, 'celebrated_levels': list(script.celebrated_levels)}
+        self.session_num = script.session_num
+        self.sessions = []
+
+    def load_bonus_pool(self):
+        return self.bonus_pool
+
+    def save_bonus_pool(self, amount):
+        self.bonus_pool = float(amount)
+
+    def load_daily_tracker(self):
+        return dict(self.tracker)
+
+    def next_session_num(self):
+        return self.session_num
+
+    def load_sessions(self):
+        return list(self.sessions)
+
+    def commit_session_end(self, date, daily_count, celebrated_levels, session_data_dict, bonus_pool):
+        self.tracker = {'date': date, 'count': daily_count, 'celebrated_levels': list(celebrated_levels)}
+        self.sessions.append(dict(session_data_dict))
+        self.bonus_pool = float(bonus_pool)
+        self.session_num += 1
+        return True
+
+
+def replay_session(script, run_question_timer, verbose=False):
+    """Runs one scripted session headlessly. Returns run_question_timer's result."""
+    clock = VirtualClock(script.date)
+    return run_question_timer(clock=clock, keys=ScriptedInput(clock, script), output=NullOutput(verbose),
+                              state_store=MemoryStateStore(script), record_events=False, instrument_timing=False,
+                              rollups=RollupStore(None), trace=False, checkpoint=False)
+
+
+# --- Command line entry point ---
+def run_replay_command(argv, run_question_timer):
+    """Entry point for `python main.py replay SCRIPT`."""
+    parser = argparse.ArgumentParser(prog="main.py replay", description="Replay a scripted session against a virtual clock.")
+    parser.add_argument('script', help="Replay script file.")
+    parser.add_argument('--csv', help="Append the resulting session row to this CSV file.")
+    parser.add_argument('--repeat', type=int, default=1, help="Replay the script N times and report timing (for benchmarks).")
+    parser.add_argument('--verbose', action='store_true', help="Print the session's messages.")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            script = ReplayScript.parse(f.read())
+    except (IOError, ScriptError) as e:
+        print(f"Could not load replay script: {e}")
+        return None
+
+    started = time.perf_counter()
+    try:
+        for _ in range(max(args.repeat, 1)):
+            result = replay_session(script, run_question_timer, verbose=args.verbose)
+    except EOFError as e:
+        print(f"Replay stopped: {e}")
+        return None
+    elapsed = time.perf_counter() - started
+    if result is None:
+        print("The script quit at the prompts; no session was recorded.")
+        return None
+
+    session = result['session']
+    print(f"Replayed {session['total_questions_in_session']} questions x{max(args.repeat, 1)} in {elapsed * 1000:.1f} ms")
+    print(f"Bonus pool at end: {result['bonus_pool']:.3f} s, daily count: {result['daily_count']}")
+    print(",".join(SESSION_FIELDNAMES))
+    print(",".join(str(session[name]) for name in SESSION_FIELDNAMES))
+
+    if args.csv:
+        file_exists = os.path.exists(args.csv)
+        with open(args.csv, mode='a', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=SESSION_FIELDNAMES)
+            if not file_exists:
+                writer.writeheader()
+            writer.writerow(session)
+    return result
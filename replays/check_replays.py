@@ -0,0 +1,101 @@
+"""Replay regression check: every script in this directory must end the same way it did before.
+
+Usage (from the repository root):
+    python replays/check_replays.py              # replay all scripts and compare with expected.json
+    python replays/check_replays.py --update     # record the current results as the expected ones
+
+Each *.txt file is a replay script (format in replay.py). It is run headlessly
+against the virtual clock with the same run_question_timer the terminal uses,
+and the final question states, bonus pool, daily count, celebrated levels and
+session row are compared with expected.json. The expectations were recorded
+with the list-based session state that QuestionSession replaced, so a mismatch
+means the timer no longer behaves as it used to. Only --update a result after
+deciding the new behaviour is the intended one.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+
+REPLAYS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(REPLAYS_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import main
+from replay import ReplayScript, replay_session
+
+EXPECTED_FILE = os.path.join(REPLAYS_DIR, "expected.json")
+RESULT_FIELDS = ('question_states', 'bonus_pool', 'daily_count', 'celebrated_levels', 'session')
+REL_TOLERANCE = 1e-9 # Same arithmetic gives the same floats; this only absorbs printing/parsing differences
+
+
+def replay_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        script = ReplayScript.parse(f.read())
+    result = replay_session(script, main.run_question_timer)
+    if result is None:
+        return None
+    return {field: result[field] for field in RESULT_FIELDS}
+
+
+def differences(expected, actual, where=""):
+    """Paths at which two results differ (numbers compared with REL_TOLERANCE)."""
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return [] if expected == actual else [f"{where}: expected {expected!r}, got {actual!r}"]
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        if math.isclose(expected, actual, rel_tol=REL_TOLERANCE, abs_tol=REL_TOLERANCE):
+            return []
+        return [f"{where}: expected {expected!r}, got {actual!r}"]
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        if expected.keys() != actual.keys():
+            return [f"{where}: expected keys {sorted(expected)}, got {sorted(actual)}"]
+        return [line for key in expected for line in differences(expected[key], actual[key], f"{where}.{key}")]
+    if isinstance(expected, list) and isinstance(actual, list):
+        if len(expected) != len(actual):
+            return [f"{where}: expected {len(expected)} items, got {len(actual)}"]
+        return [line for i, (e, a) in enumerate(zip(expected, actual)) for line in differences(e, a, f"{where}[{i}]")]
+    return [] if expected == actual else [f"{where}: expected {expected!r}, got {actual!r}"]
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the scripts in replays/ and compare the results with expected.json.")
+    parser.add_argument('--update', action='store_true', help="Record the current results as expected.")
+    args = parser.parse_args(argv)
+
+    scripts = sorted(glob.glob(os.path.join(REPLAYS_DIR, "*.txt")))
+    results = {os.path.splitext(os.path.basename(path))[0]: replay_file(path) for path in scripts}
+
+    if args.update:
+        with open(EXPECTED_FILE, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print(f"Recorded {len(results)} replay results in '{EXPECTED_FILE}'.")
+        return 0
+
+    with open(EXPECTED_FILE, 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+    names = sorted(set(expected) | set(results))
+    passed = 0
+    for name in names:
+        if name not in results:
+            problems = ["script missing"]
+        elif name not in expected:
+            problems = ["no expected result (run with --update to record one)"]
+        else:
+            problems = differences(expected[name], results[name])
+        if problems:
+            print(f"FAIL {name}")
+            for line in problems[:10]:
+                print(f"  {line}")
+            if len(problems) > 10:
+                print(f"  ... {len(problems) - 10} more")
+        else:
+            passed += 1
+            print(f"ok   {name}")
+    print(f"\n{passed} of {len(names)} replays match '{os.path.basename(EXPECTED_FILE)}'.")
+    return 0 if passed == len(names) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
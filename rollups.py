@@ -0,0 +1,247 @@
+import json
+import os
+from datetime import date as Date, timedelta
+
+from atomic_file import atomic_write
+
+# --- Layout of the rollup snapshot (JSON) ---
+# days:      {"YYYY-MM-DD": totals}      weeks: {"YYYY-Www": totals} (ISO weeks)
+# subjects:  {"Physics": totals}         totals = {"sessions", "questions", "seconds"}
+# streak:    {"current", "best", "last_date"}  consecutive days with at least one session
+# goal_hits: [{"date", "goal", "session_num"}]  daily goals in the order they were reached
+# journal_seq: sequence number of the last journal entry the snapshot includes
+# Sessions recorded since the snapshot are appended to <path>.journal, one JSON line each with a
+# rising "seq"; entries at or below journal_seq are already counted, so replaying them is a no-op.
+ROLLUP_VERSION = 3
+COMPACT_EVERY = 256 # Journal entries before they are folded into a new snapshot
+
+
+def empty_rollups():
+    return {
+        'version': ROLLUP_VERSION,
+        'days': {},
+        'weeks': {},
+        'subjects': {},
+        'streak': {'current': 0, 'best': 0, 'last_date': None},
+        'goal_hits': [],
+        'journal_seq': 0,
+    }
+
+
+def week_key(date_str):
+    """ISO week of a YYYY-MM-DD date, e.g. '2025-W07'."""
+    year, week, _weekday = Date.fromisoformat(date_str).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _add_totals(table, key, questions, seconds):
+    totals = table.get(key)
+    if totals is None:
+        totals = table[key] = {'sessions': 0, 'questions': 0, 'seconds': 0.0}
+    totals['sessions'] += 1
+    totals['questions'] += questions
+    totals['seconds'] += seconds
+
+
+def recount_streak(dates):
+    """{'current', 'best', 'last_date'} from scratch: current is the run ending at the latest date."""
+    best = run = 0
+    previous = None
+    for day in sorted(Date.fromisoformat(d) for d in dates):
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        best = max(best, run)
+        previous = day
+    return {'current': run, 'best': best, 'last_date': previous.isoformat() if previous else None}
+
+
+class RollupStore:
+    """Running per-day, per-week and per-subject totals, streaks and goal history.
+
+    record_session() folds one finished session into the totals with a handful
+    of dict updates, so daily goals, streaks and weekly summaries never need a
+    rescan of the session history. Each update appends one line to a journal;
+    every COMPACT_EVERY sessions the journal is folded into a new snapshot,
+    written atomically. With path=None the rollups are kept in memory only.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = path + ".journal" if path is not None else None
+        self.data = None
+        self.needs_rebuild = False # Set by load() when there is no usable snapshot
+        self.rebuilt = False # Set by rebuild(): every session in the history it was given is already counted
+        self._journal_entries = 0
+
+    def exists(self):
+        return self.path is not None and os.path.exists(self.path)
+
+    def load(self):
+        """Returns the rollups, reading the snapshot and journal on first use.
+
+        A missing, unreadable or older-format snapshot gives an empty set and
+        sets needs_rebuild, so the caller can rebuild it from the history.
+        """
+        if self.data is None:
+            self.data = empty_rollups()
+            self.needs_rebuild = self.path is not None
+            if self.exists():
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        loaded = json.load(f)
+                    if isinstance(loaded, dict) and loaded.get('version') == ROLLUP_VERSION:
+                        self.data = loaded
+                        self.needs_rebuild = False
+                    else:
+                        print(f"Warning: Unexpected format in rollup file '{self.path}'. Rebuilding it.")
+                except (IOError, ValueError) as e:
+                    print(f"Error loading rollups from '{self.path}': {e}. Rebuilding them.")
+            if not self.needs_rebuild:
+                self._replay_journal()
+        return self.data
+
+    def _replay_journal(self):
+        if self.journal_path is None or not os.path.exists(self.journal_path):
+            return
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError: # Torn last line from a crash mid-append; that session wasn't confirmed
+                        self._journal_entries = COMPACT_EVERY # Next update writes a snapshot instead of appending after it
+                        break
+                    self._journal_entries += 1
+                    if entry['seq'] <= self.data['journal_seq']:
+                        continue # Already in the snapshot (a crash came between writing it and emptying the journal)
+                    self._fold(entry['session'], entry['goals'])
+                    self.data['journal_seq'] = entry['seq']
+        except (IOError, KeyError, TypeError) as e:
+            print(f"Error reading rollup journal '{self.journal_path}': {e}. Later sessions may be missing from the rollups.")
+
+    def save(self):
+        """Writes a new snapshot (atomically replaced) and empties the journal it includes."""
+        if self.path is None or self.data is None:
+            return
+        with atomic_write(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.data, separators=(',', ':'))) # dumps() uses the C encoder; dump() streams in Python
+        # A crash before this truncation leaves entries the snapshot's journal_seq already covers
+        with open(self.journal_path, 'w', encoding='utf-8'):
+            pass
+        self._journal_entries = 0
+        self.needs_rebuild = False
+
+    # --- Updates ---
+    def _fold(self, session_data_dict, goals_reached=()):
+        data = self.load()
+        session_num = session_data_dict['session_num']
+        date_str = session_data_dict['date']
+        questions = session_data_dict['total_questions_in_session']
+        seconds = session_data_dict['total_time_taken']
+        new_day = date_str not in data['days']
+
+        _add_totals(data['days'], date_str, questions, seconds)
+        _add_totals(data['weeks'], week_key(date_str), questions, seconds)
+        _add_totals(data['subjects'], session_data_dict['subject'], questions, seconds)
+
+        streak = data['streak']
+        last_date = streak['last_date']
+        if not new_day:
+            pass # A day already counted can't change any streak
+        elif last_date is None or date_str > last_date:
+            if last_date is not None and Date.fromisoformat(date_str) - Date.fromisoformat(last_date) == timedelta(days=1):
+                streak['current'] += 1
+            else:
+                streak['current'] = 1
+            streak['last_date'] = date_str
+            streak['best'] = max(streak['best'], streak['current'])
+        else: # An earlier day filled in (e.g. a merged or late-saved session) can join two runs
+            data['streak'] = recount_streak(data['days'])
+
+        for goal in goals_reached:
+            data['goal_hits'].append({'date': date_str, 'goal': goal, 'session_num': session_num})
+
+    def record_session(self, session_data_dict, goals_reached=()):
+        """Adds one finished session and the daily goals it reached, appending it to the journal.
+
+        Call it once per session, and not for a session already in the history
+        given to rebuild() (see `rebuilt`).
+        """
+        self._fold(session_data_dict, goals_reached)
+        self.data['journal_seq'] += 1
+        if self.path is None:
+            return
+        if self.needs_rebuild or self._journal_entries + 1 >= COMPACT_EVERY:
+            self.save()
+            return
+        entry = {'seq': self.data['journal_seq'], 'session': session_data_dict, 'goals': list(goals_reached)}
+        with open(self.journal_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        self._journal_entries += 1
+
+    def rebuild(self, sessions, goals):
+        """Recomputes everything from past sessions (when there is no usable rollup file yet).
+
+        Goal hits are reconstructed from the daily totals: a goal counts as
+        reached by the session that took the day's total past it.
+        """
+        if self.journal_path is not None and os.path.exists(self.journal_path):
+            os.remove(self.journal_path) # The history covers it; removed first so it can't be replayed onto the new snapshot
+        self._journal_entries = 0
+        self.data = empty_rollups()
+        dated = []
+        for session in sessions:
+            try:
+                Date.fromisoformat(session['date'])
+                dated.append(session)
+            except (TypeError, ValueError):
+                print(f"Warning: Leaving session {session['session_num']} with unreadable date '{session['date']}' out of the rollups.")
+        day_counts = {}
+        for session in sorted(dated, key=lambda s: (s['date'], s['session_num'])):
+            date_str = session['date']
+            before = day_counts.get(date_str, 0)
+            after = day_counts[date_str] = before + session['total_questions_in_session']
+            self._fold(session, [goal for goal in goals if before < goal <= after])
+        self.save()
+        self.rebuilt = True
+
+    # --- Queries (no history access) ---
+    def day(self, date_str):
+        return self.load()['days'].get(date_str, {'sessions': 0, 'questions': 0, 'seconds': 0.0})
+
+    def week(self, date_str):
+        return self.load()['weeks'].get(week_key(date_str), {'sessions': 0, 'questions': 0, 'seconds': 0.0})
+
+    def current_streak(self, today):
+        """Consecutive days with a session, ending today or yesterday (0 once a day was missed)."""
+        streak = self.load()['streak']
+        if streak['last_date'] is None:
+            return 0
+        gap = Date.fromisoformat(today) - Date.fromisoformat(streak['last_date'])
+        return streak['current'] if gap <= timedelta(days=1) else 0
+
+    def best_streak(self):
+        return self.load()['streak']['best']
+
+    def summary_lines(self, today, recent_weeks=4):
+        """Human-readable overview for `python main.py rollups`."""
+        data = self.load()
+        today_totals = self.day(today)
+        lines = [
+            f"Today ({today}): {today_totals['questions']} questions in {today_totals['sessions']} sessions",
+            f"This week ({week_key(today)}): {self.week(today)['questions']} questions",
+            f"Streak: {self.current_streak(today)} days (best {self.best_streak()})",
+            "",
+            f"{'Week':<10} {'Sessions':>8} {'Questions':>10} {'Hours':>7}",
+        ]
+        for key in sorted(data['weeks'])[-recent_weeks:]:
+            totals = data['weeks'][key]
+            lines.append(f"{key:<10} {totals['sessions']:>8} {totals['questions']:>10} {totals['seconds'] / 3600:>7.1f}")
+        lines += ["", f"{'Subject':<10} {'Sessions':>8} {'Questions':>10} {'Hours':>7}"]
+        for subject in sorted(data['subjects']):
+            totals = data['subjects'][subject]
+            lines.append(f"{subject:<10} {totals['sessions']:>8} {totals['questions']:>10} {totals['seconds'] / 3600:>7.1f}")
+        hits = data['goal_hits']
+        lines += ["", f"Daily goals reached: {len(hits)}"]
+        for hit in hits[-5:]:
+            lines.append(f"  {hit['date']}: {hit['goal']} questions (session {hit['session_num']})")
+        return lines
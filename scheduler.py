@@ -0,0 +1,192 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class ScheduledTimer:
+    """Handle for one timer in a DeadlineScheduler.
+
+    The callback is called as callback(timer, early): early is True when the
+    timer was fired ahead of its deadline with expire(). A timer with an
+    interval re-arms itself after each firing (break reminders, display ticks).
+    """
+
+    __slots__ = ('scheduler', 'name', 'callback', 'interval', 'deadline', 'paused_remaining', 'active', '_seq')
+
+    def __init__(self, scheduler, name, callback, interval):
+        self.scheduler = scheduler
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.deadline = None
+        self.paused_remaining = None
+        self.active = True
+        self._seq = None # Sequence number of this timer's live heap entry
+
+    @property
+    def paused(self):
+        return self.paused_remaining is not None
+
+    def time_left(self):
+        """Seconds until the timer fires (frozen while paused, None once done)."""
+        if not self.active:
+            return None
+        if self.paused:
+            return self.paused_remaining
+        return max(self.deadline - self.scheduler.clock(), 0.0)
+
+    def pause(self):
+        self.scheduler.pause(self)
+
+    def resume(self):
+        self.scheduler.resume(self)
+
+    def cancel(self):
+        self.scheduler.cancel(self)
+
+    def expire(self):
+        """Fires the timer now, ahead of its deadline."""
+        self.scheduler.expire(self)
+
+
+class DeadlineScheduler:
+    """Runs any number of timers from one min-heap of deadlines on a monotonic clock.
+
+    Nothing is polled: a caller either asks time_until_next() and sleeps that
+    long in its own wait (the question timer does this together with its key
+    wait), or calls wait() / run_until(), which block on a condition variable
+    until the earliest deadline or until another thread adds or changes a
+    timer. Cancelled and paused timers are dropped from the heap lazily, so
+    every operation is O(log n).
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._heap = [] # (deadline, seq, timer)
+        self._seq = itertools.count()
+        self._changed = threading.Condition()
+
+    # --- Scheduling ---
+    def _push(self, timer, deadline):
+        timer.deadline = deadline
+        timer._seq = next(self._seq)
+        heapq.heappush(self._heap, (deadline, timer._seq, timer))
+        self._changed.notify_all()
+
+    def call_at(self, deadline, callback, name=None, interval=None):
+        """Schedules callback(timer, early) at `deadline` on the scheduler's clock."""
+        timer = ScheduledTimer(self, name, callback, interval)
+        with self._changed:
+            self._push(timer, deadline)
+        return timer
+
+    def call_later(self, delay, callback, name=None, interval=None):
+        return self.call_at(self.clock() + delay, callback, name, interval)
+
+    def call_every(self, interval, callback, name=None):
+        """Repeating timer whose first firing is one interval from now."""
+        return self.call_at(self.clock() + interval, callback, name, interval)
+
+    def cancel(self, timer):
+        with self._changed:
+            timer.active = False
+            timer._seq = None
+            self._changed.notify_all()
+
+    def pause(self, timer):
+        """Freezes the timer's remaining time until resume()."""
+        with self._changed:
+            if timer.active and not timer.paused:
+                timer.paused_remaining = max(timer.deadline - self.clock(), 0.0)
+                timer._seq = None
+                self._changed.notify_all()
+
+    def resume(self, timer):
+        with self._changed:
+            if timer.active and timer.paused:
+                remaining, timer.paused_remaining = timer.paused_remaining, None
+                self._push(timer, self.clock() + remaining)
+
+    def expire(self, timer):
+        """Fires a timer immediately (early expiry), re-arming it if it repeats."""
+        with self._changed:
+            if not timer.active:
+                return
+            now = self.clock()
+            timer.deadline = now # A repeating timer's next period starts from the early firing
+            self._after_firing(timer, now)
+        timer.callback(timer, True)
+
+    def _after_firing(self, timer, now):
+        """Re-arms a repeating timer from its last deadline (skipping missed periods) or retires it."""
+        timer.paused_remaining = None
+        if timer.interval:
+            deadline = (timer.deadline or now) + timer.interval
+            if deadline <= now:
+                deadline += ((now - deadline) // timer.interval + 1) * timer.interval
+            self._push(timer, deadline)
+        else:
+            timer.active = False
+            timer._seq = None
+
+    # --- Queries ---
+    def _peek(self):
+        """Earliest live heap entry, discarding stale ones. Call with the lock held."""
+        heap = self._heap
+        while heap and heap[0][2]._seq != heap[0][1]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def next_deadline(self):
+        with self._changed:
+            entry = self._peek()
+        return entry[0] if entry else None
+
+    def time_until_next(self):
+        """Seconds until the next timer fires (0.0 if overdue), or None when nothing is scheduled."""
+        deadline = self.next_deadline()
+        return None if deadline is None else max(deadline - self.clock(), 0.0)
+
+    def __len__(self):
+        with self._changed:
+            return sum(1 for _deadline, seq, timer in self._heap if timer._seq == seq)
+
+    # --- Running ---
+    def run_due(self):
+        """Fires every timer whose deadline has passed. Returns how many fired."""
+        fired = 0
+        while True:
+            with self._changed:
+                entry = self._peek()
+                now = self.clock()
+                if entry is None or entry[0] > now:
+                    return fired
+                heapq.heappop(self._heap)
+                timer = entry[2]
+                self._after_firing(timer, now)
+            timer.callback(timer, False) # Outside the lock: callbacks may schedule more timers
+            fired += 1
+
+    def wait(self, timeout=None):
+        """Blocks until the next deadline, a timer change from another thread, or `timeout` seconds."""
+        with self._changed:
+            entry = self._peek()
+            delay = timeout
+            if entry is not None:
+                until_next = max(entry[0] - self.clock(), 0.0)
+                delay = until_next if delay is None else min(delay, until_next)
+            if delay is None or delay > 0:
+                self._changed.wait(delay)
+
+    def run_until(self, done, timeout=None):
+        """Fires timers as they come due until done() is true (or `timeout` seconds pass)."""
+        stop_at = None if timeout is None else self.clock() + timeout
+        while not done():
+            self.run_due()
+            if done():
+                break
+            remaining = None if stop_at is None else stop_at - self.clock()
+            if remaining is not None and remaining <= 0:
+                break
+            self.wait(remaining)
@@ -0,0 +1,295 @@
+import argparse
+import asyncio
+import itertools
+import json
+
+from session_core import QuestionSession
+
+# --- Local HTTP API ---
+# POST   /sessions                 {"questions": 30, "limit_minutes": 2, "bonus_pool": 0}  -> session state
+# GET    /sessions                 -> {"sessions": N, "active": M}
+# GET    /sessions/<id>            -> session state
+# POST   /sessions/<id>/keys       {"key": "space" | "a" | "p" | "r", "limit_minutes": 3}  -> session state
+# GET    /sessions/<id>/events     -> Server-Sent Events stream of countdown updates
+# DELETE /sessions/<id>            -> final summary (same fields as a session CSV row)
+# A finished session stays readable for --finished-ttl seconds, then is dropped as if DELETEd.
+DEFAULT_PUSH_INTERVAL = 1.0 # Seconds between countdown pushes to subscribed clients
+DEFAULT_FINISHED_TTL = 300.0 # Seconds a finished session is kept for clients to fetch its state or summary
+MAX_SUBSCRIBER_BUFFER = 64 * 1024 # Drop subscribers that stop reading
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ServerSession:
+    """One student's timer: a QuestionSession driven by an asyncio task on the event loop clock.
+
+    Key presses are applied to the state machine as soon as they arrive; the
+    task only sleeps until the current question's deadline (or the next push,
+    while someone is subscribed), so an idle session costs no CPU.
+    """
+
+    __slots__ = ('session_id', 'core', 'push_interval', 'subscribers', 'active', 'task', '_loop', '_wakeup')
+
+    def __init__(self, session_id, num_questions, time_limit, bonus_pool, push_interval, loop):
+        self.session_id = session_id
+        self.core = QuestionSession(num_questions, time_limit, bonus_pool)
+        self.push_interval = push_interval
+        self.subscribers = []
+        self._loop = loop
+        self._wakeup = None
+        self.active = self.core.begin_segment(loop.time())
+        self.task = loop.create_task(self._run())
+
+    # --- Timer task ---
+    async def _run(self):
+        loop = self._loop
+        while self.active:
+            now = loop.time()
+            if self.core.remaining(now) <= 0:
+                self.core.time_out(now)
+                self.active = self.core.begin_segment(now)
+                self.publish('timeout')
+                continue
+
+            wake_at = self.core.deadline()
+            if self.subscribers:
+                wake_at = min(wake_at, now + self.push_interval)
+            self._wakeup = loop.create_future()
+            timer = loop.call_at(wake_at, self._wake)
+            await self._wakeup
+            timer.cancel()
+            if self.subscribers and self.active:
+                self.publish('tick')
+        self.publish('finished')
+
+    def _wake(self):
+        if self._wakeup is not None and not self._wakeup.done():
+            self._wakeup.set_result(None)
+
+    # --- Key handling ---
+    def press(self, key, limit_minutes=None):
+        """Applies one key press, exactly as the live timer would."""
+        if not self.active:
+            raise HttpError(409, "Session is finished")
+        now = self._loop.time()
+        core = self.core
+        if key == 'a':
+            core.transfer_bonus()
+        elif key == 'space':
+            core.skip(now)
+            self.active = core.begin_segment(now)
+        elif key == 'p':
+            if core.go_back(now) is not None:
+                self.active = core.begin_segment(now)
+        elif key == 'r':
+            if limit_minutes is None or limit_minutes <= 0:
+                raise HttpError(400, "'r' needs a positive limit_minutes")
+            core.end_segment(now)
+            core.change_limit(limit_minutes * 60)
+            self.active = core.begin_segment(now)
+        else:
+            raise HttpError(400, f"Unknown key '{key}'")
+        self.publish(key)
+        self._wake() # Let the task recompute its deadline
+        return self.state()
+
+    def stop(self):
+        """Ends the session at its current position."""
+        if self.active:
+            self.core.end_segment(self._loop.time())
+            self.active = False
+            self._wake()
+
+    # --- Reporting ---
+    def state(self):
+        core = self.core
+        remaining = max(core.remaining(self._loop.time()), 0.0) if self.active else 0.0
+        return {
+            'id': self.session_id,
+            'question': core.current_question_num,
+            'num_questions': core.num_questions,
+            'remaining': round(remaining, 3),
+            'bonus_pool': round(core.bonus_pool, 3),
+            'finished': not self.active,
+        }
+
+    def summary(self):
+        total = self.core.total_time_spent()
+        num_questions = self.core.num_questions
+        return {
+            'id': self.session_id,
+            'total_time_taken': total,
+            'avg_time_per_q': total / num_questions if num_questions else 0.0,
+            'bonus_at_end': self.core.bonus_pool,
+            'total_questions_in_session': num_questions,
+        }
+
+    def publish(self, event):
+        """Pushes the current state to every SSE subscriber without waiting on any of them."""
+        if not self.subscribers:
+            return
+        payload = f"event: {event}\ndata: {json.dumps(self.state())}\n\n".encode()
+        for writer in list(self.subscribers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                self.subscribers.remove(writer)
+                writer.close()
+            else:
+                writer.write(payload)
+
+
+class TimerServer:
+    """Runs many ServerSessions on one event loop behind a small HTTP/1.1 + SSE API."""
+
+    def __init__(self, push_interval=DEFAULT_PUSH_INTERVAL, finished_ttl=DEFAULT_FINISHED_TTL):
+        self.push_interval = push_interval
+        self.finished_ttl = finished_ttl
+        self.sessions = {}
+        self._ids = itertools.count(1)
+
+    def _on_finished(self, session):
+        """When a session's timer task ends, schedules its removal so abandoned sessions don't pile up."""
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.finished_ttl, self._expire, session)
+
+    def _expire(self, session):
+        if self.sessions.get(session.session_id) is session:
+            del self.sessions[session.session_id]
+        for writer in session.subscribers: # Nothing more will be pushed
+            writer.close()
+        session.subscribers.clear()
+
+    # --- Routing ---
+    def _session(self, session_id):
+        try:
+            return self.sessions[int(session_id)]
+        except (KeyError, ValueError):
+            raise HttpError(404, f"No session '{session_id}'")
+
+    def handle(self, method, parts, body):
+        """Returns (status, payload) for a non-streaming request."""
+        if parts == ['sessions'] and method == 'POST':
+            try:
+                num_questions = int(body.get('questions', 0))
+                limit_minutes = float(body.get('limit_minutes', 0))
+                bonus_pool = float(body.get('bonus_pool', 0.0))
+            except (TypeError, ValueError):
+                raise HttpError(400, "questions and limit_minutes must be numbers")
+            if num_questions <= 0 or limit_minutes <= 0:
+                raise HttpError(400, "questions and limit_minutes must be positive")
+            session_id = next(self._ids)
+            session = ServerSession(session_id, num_questions, limit_minutes * 60, bonus_pool,
+                                    self.push_interval, asyncio.get_running_loop())
+            self.sessions[session_id] = session
+            session.task.add_done_callback(lambda _task: self._on_finished(session))
+            return 201, session.state()
+        if parts == ['sessions'] and method == 'GET':
+            return 200, {'sessions': len(self.sessions), 'active': sum(1 for s in self.sessions.values() if s.active)}
+        if len(parts) == 2 and parts[0] == 'sessions':
+            session = self._session(parts[1])
+            if method == 'GET':
+                return 200, session.state()
+            if method == 'DELETE':
+                session.stop()
+                del self.sessions[session.session_id]
+                return 200, session.summary()
+        if len(parts) == 3 and parts[0] == 'sessions' and parts[2] == 'keys' and method == 'POST':
+            session = self._session(parts[1])
+            limit = body.get('limit_minutes')
+            try:
+                limit = float(limit) if limit is not None else None
+            except (TypeError, ValueError):
+                raise HttpError(400, "limit_minutes must be a number")
+            return 200, session.press(body.get('key'), limit)
+        raise HttpError(404, "Not found")
+
+    # --- HTTP plumbing ---
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                raw_body = await reader.readexactly(int(headers.get('content-length', 0)))
+                parts = [p for p in path.split('?', 1)[0].split('/') if p]
+
+                if method == 'GET' and len(parts) == 3 and parts[0] == 'sessions' and parts[2] == 'events':
+                    await self._stream_events(parts[1], reader, writer)
+                    break
+
+                try:
+                    body = json.loads(raw_body) if raw_body else {}
+                    if not isinstance(body, dict):
+                        raise HttpError(400, "Body must be a JSON object")
+                    status, payload = self.handle(method, parts, body)
+                except json.JSONDecodeError:
+                    status, payload = 400, {'error': "Invalid JSON"}
+                except HttpError as e:
+                    status, payload = e.status, {'error': e.message}
+                self._write_response(writer, status, payload)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _write_response(writer, status, payload):
+        data = json.dumps(payload).encode()
+        reason = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 409: 'Conflict'}.get(status, 'Error')
+        writer.write(f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+
+    async def _stream_events(self, session_id, reader, writer):
+        try:
+            session = self._session(session_id)
+        except HttpError as e:
+            self._write_response(writer, e.status, {'error': e.message})
+            await writer.drain()
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n\r\n")
+        session.subscribers.append(writer)
+        session.publish('state')
+        session._wake() # Start periodic pushes now that someone is listening
+        try:
+            await reader.read() # Returns when the client disconnects
+        finally:
+            if writer in session.subscribers:
+                session.subscribers.remove(writer)
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        print(f"Qimer timer server listening on http://{host}:{port} (push interval {self.push_interval}s)")
+        async with server:
+            await server.serve_forever()
+
+
+# --- Command line entry point ---
+def run_server_command(argv):
+    """Entry point for `python main.py serve`."""
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Run many question timers behind a local HTTP API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--push-interval', type=float, default=DEFAULT_PUSH_INTERVAL,
+                        help=f"Seconds between countdown pushes to event subscribers (default {DEFAULT_PUSH_INTERVAL}).")
+    parser.add_argument('--finished-ttl', type=float, default=DEFAULT_FINISHED_TTL,
+                        help=f"Seconds a finished session is kept before it is dropped (default {DEFAULT_FINISHED_TTL:g}).")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(TimerServer(args.push_interval, args.finished_ttl).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
@@ -0,0 +1,283 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+QUESTION_STATE_KEYS = ('initial_limit', 'current_remaining', 'total_time_spent_on_this_q')
+SLOT_HAS_REMAINING = 1 # slot_state() flags
+SLOT_HAS_LIMIT = 2
+
+
+class QuestionState:
+    """Live, read-only view of one question with the original per-question dict keys."""
+
+    __slots__ = ('_session', '_index')
+
+    def __init__(self, session, index):
+        self._session = session
+        self._index = index
+
+    def __getitem__(self, key):
+        if key == 'current_remaining':
+            return self._session._remaining_at(self._index)
+        if key == 'total_time_spent_on_this_q':
+            return self._session._spent[self._index]
+        if key == 'initial_limit':
+            return self._session._limit_at(self._index)
+        raise KeyError(key)
+
+    def to_dict(self):
+        return {key: self[key] for key in QUESTION_STATE_KEYS}
+
+
+class QuestionSession:
+    """The question timer's state machine, free of any clock, keyboard or console.
+
+    Callers pass the current time into every method. A question is worked on in
+    "segments": begin_segment() starts the clock on the current question, and the
+    time since then is credited to it when the segment ends (skip, back, re-limit
+    or timeout). The same object drives the live timer, headless replays and the
+    multi-session server.
+
+    State is kept compactly so drills with thousands of questions stay cheap:
+    time spent is a typed array, and a question's limit comes from a short
+    list of (first question, limit) breakpoints that 'r' appends to. Only
+    questions that have been worked on get an entry in the sparse remaining-time
+    map; each entry is stamped with an epoch so a later 'r' invalidates it
+    without touching it. Used-up questions are kept in a sorted array, so
+    re-limiting and skipping past them take O(log n) instead of a scan.
+
+    Indices whose stored state changed are collected in `changed` so a
+    checkpoint can write just those (see checkpoint.py).
+    """
+
+    def __init__(self, num_questions, time_limit, bonus_pool=0.0):
+        self.num_questions = num_questions
+        self.bonus_pool = bonus_pool
+        self.current_question_num = 1
+        self.segment_start = None
+        self._limit_starts = [0] # 0-based index where each limit starts applying
+        self._limit_values = [time_limit]
+        self._limit_epochs = [0]
+        self._epoch = 0
+        self._remaining = {} # index -> (epoch, seconds left) for questions worked on
+        self._spent = array('d', bytes(8 * num_questions))
+        self._used_up = array('q') # Sorted indices with no time left after being worked on
+        self.changed = {0} # Indices not yet persisted; the base limit's breakpoint lives at 0
+        self.resume_elapsed = 0.0 # Time already spent in the current segment before a crash; applied by begin_segment
+
+    # --- Compact storage ---
+    def _breakpoint(self, index):
+        return bisect_right(self._limit_starts, index) - 1
+
+    def _limit_at(self, index):
+        return self._limit_values[self._breakpoint(index)]
+
+    def _remaining_at(self, index):
+        k = self._breakpoint(index)
+        entry = self._remaining.get(index)
+        if entry is not None and entry[0] >= self._limit_epochs[k]:
+            return entry[1]
+        return self._limit_values[k]
+
+    def _set_remaining(self, index, seconds):
+        self._remaining[index] = (self._epoch, seconds)
+        self.changed.add(index)
+        self._refresh_used_up(index)
+
+    def _refresh_used_up(self, index):
+        used_up = self._remaining_at(index) <= 0 and self._spent[index] > 0
+        pos = bisect_left(self._used_up, index)
+        listed = pos < len(self._used_up) and self._used_up[pos] == index
+        if used_up and not listed:
+            self._used_up.insert(pos, index)
+        elif listed and not used_up:
+            del self._used_up[pos]
+
+    def _next_open(self, index):
+        """First index >= index that is not used up, by binary search over the run of used-up indices."""
+        used_up = self._used_up
+        pos = bisect_left(used_up, index)
+        if pos == len(used_up) or used_up[pos] != index:
+            return index
+        # Within a run of consecutive indices, used_up[i] - i stays constant
+        lo, hi = pos, len(used_up) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if used_up[mid] - mid == index - pos:
+                lo = mid
+            else:
+                hi = mid - 1
+        return used_up[lo] + 1
+
+    # --- Checkpoint support ---
+    def slot_state(self, index):
+        """Stored state of one question: (spent, remaining, remaining_epoch, limit, limit_epoch, flags)."""
+        flags = 0
+        remaining, remaining_epoch = 0.0, 0
+        entry = self._remaining.get(index)
+        if entry is not None:
+            flags |= SLOT_HAS_REMAINING
+            remaining_epoch, remaining = entry
+        limit, limit_epoch = 0.0, 0
+        k = self._breakpoint(index)
+        if k >= 0 and self._limit_starts[k] == index:
+            flags |= SLOT_HAS_LIMIT
+            limit, limit_epoch = self._limit_values[k], self._limit_epochs[k]
+        return self._spent[index], remaining, remaining_epoch, limit, limit_epoch, flags
+
+    @property
+    def epoch(self):
+        """Bumped by every change_limit(); stored state from older epochs is outdated lazily."""
+        return self._epoch
+
+    def take_changes(self):
+        """Returns the indices changed since the last call and starts a new set."""
+        changed, self.changed = self.changed, set()
+        return changed
+
+    @classmethod
+    def from_slots(cls, num_questions, bonus_pool, current_question_num, epoch, slots):
+        """Rebuilds a session from (index, slot_state()) pairs; indices not given are untouched questions."""
+        session = cls(num_questions, 0.0, bonus_pool)
+        breakpoints = []
+        session.current_question_num = current_question_num
+        session._epoch = epoch
+        session.changed = set()
+        for index, (spent, remaining, remaining_epoch, limit, limit_epoch, flags) in slots:
+            session._spent[index] = spent
+            session.changed.add(index)
+            if flags & SLOT_HAS_REMAINING:
+                session._remaining[index] = (remaining_epoch, remaining)
+            if flags & SLOT_HAS_LIMIT:
+                breakpoints.append((index, limit, limit_epoch))
+        breakpoints.sort()
+        if not breakpoints or breakpoints[0][0] != 0:
+            raise ValueError("no base time limit for the first question")
+        session._limit_starts = [start for start, _limit, _epoch in breakpoints]
+        session._limit_values = [limit for _start, limit, _epoch in breakpoints]
+        session._limit_epochs = [limit_epoch for _start, _limit, limit_epoch in breakpoints]
+        for index in session._remaining:
+            session._refresh_used_up(index)
+        return session
+
+    @property
+    def question_states(self):
+        """Snapshot of every question as the original list of dicts (O(n); for reports and results)."""
+        return [QuestionState(self, i).to_dict() for i in range(self.num_questions)]
+
+    # --- State machine ---
+    def is_finished(self):
+        """True once navigation has moved past the last question or before the first."""
+        return not (1 <= self.current_question_num <= self.num_questions)
+
+    def current_state(self):
+        return QuestionState(self, self.current_question_num - 1)
+
+    def begin_segment(self, now):
+        """Moves past questions that are already used up and starts timing the current one.
+
+        Returns False when there is no question left to time.
+        """
+        if self.is_finished():
+            return False
+        index = self._next_open(self.current_question_num - 1)
+        if index >= self.num_questions:
+            self.current_question_num = self.num_questions + 1
+            return False
+        self.current_question_num = index + 1
+        self.segment_start = now - self.resume_elapsed
+        self.resume_elapsed = 0.0
+        return True
+
+    def elapsed(self, now):
+        """Seconds spent on the current question in this segment."""
+        return now - self.segment_start
+
+    def remaining(self, now):
+        """Seconds left on the current question."""
+        return self._remaining_at(self.current_question_num - 1) - self.elapsed(now)
+
+    def deadline(self):
+        """Time at which the current question runs out (in the caller's clock)."""
+        return self.segment_start + self._remaining_at(self.current_question_num - 1)
+
+    def end_segment(self, now):
+        """Credits the segment's time to the current question. Returns its remaining time."""
+        index = self.current_question_num - 1
+        elapsed = self.elapsed(now)
+        remaining = self._remaining_at(index) - elapsed
+        self._spent[index] += elapsed
+        self._set_remaining(index, remaining)
+        return remaining
+
+    def time_out(self, now):
+        """The current question ran out of time."""
+        index = self.current_question_num - 1
+        self._spent[index] += self.elapsed(now)
+        self._set_remaining(index, 0.0)
+
+    def transfer_bonus(self):
+        """'a': moves the whole bonus pool onto the current question. Returns the amount moved."""
+        transfer_amount = self.bonus_pool
+        if transfer_amount > 0:
+            index = self.current_question_num - 1
+            self._set_remaining(index, self._remaining_at(index) + transfer_amount)
+            self.bonus_pool = 0
+            return transfer_amount
+        return 0.0
+
+    def skip(self, now):
+        """Space: ends the question, banking its remaining time. Returns that remaining time."""
+        remaining = self.end_segment(now)
+        if remaining > 0:
+            self.bonus_pool += remaining
+        self._set_remaining(self.current_question_num - 1, 0.0)
+        self.current_question_num += 1
+        return remaining
+
+    def go_back(self, now):
+        """'p': returns to the previous question, topping it up from the pool if it has <10s left.
+
+        Returns the bonus time added (0.0 if none), or None when already at the
+        first question (nothing changes in that case).
+        """
+        if self.current_question_num <= 1:
+            return None
+        self.end_segment(now)
+        prev_index = self.current_question_num - 2
+        prev_remaining = self._remaining_at(prev_index)
+        transfer_amount = 0.0
+        if prev_remaining < 10 and self.bonus_pool > 0:
+            transfer_amount = self.bonus_pool
+            self._set_remaining(prev_index, prev_remaining + transfer_amount)
+            self.bonus_pool = 0
+        self.current_question_num -= 1
+        return transfer_amount
+
+    def change_limit(self, new_time_limit):
+        """'r': applies a new base limit from the current question on (after end_segment).
+
+        O(log n): later questions pick the new limit up lazily from a new
+        breakpoint, and stale per-question entries are outdated by its epoch.
+        """
+        index = self.current_question_num - 1
+        current_remaining = min(self._remaining_at(index), new_time_limit)
+        while self._limit_starts and self._limit_starts[-1] >= index:
+            self.changed.add(self._limit_starts[-1])
+            self._limit_starts.pop()
+            self._limit_values.pop()
+            self._limit_epochs.pop()
+        self._epoch += 1
+        self._limit_starts.append(index)
+        self._limit_values.append(new_time_limit)
+        self._limit_epochs.append(self._epoch)
+        self.changed.add(index)
+
+        del self._used_up[bisect_left(self._used_up, index):]
+        self._set_remaining(index, current_remaining)
+        if new_time_limit <= 0: # Only a non-positive limit can leave later worked-on questions used up
+            for later in range(index + 1, self.num_questions):
+                if self._spent[later] > 0:
+                    self._refresh_used_up(later)
+
+    def total_time_spent(self):
+        return sum(self._spent)
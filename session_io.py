@@ -0,0 +1,123 @@
+import sys
+import time
+from datetime import datetime
+
+from audio import TickPlayer
+from celebration import celebration_for_goal
+from key_input import KeyInputEngine
+from status_line import TEXT_RESOLUTION_SECONDS, StatusLine
+
+# --- Pluggable backends for run_question_timer ---
+# Clock:  now(), monotonic(), sleep(seconds), today()
+# Input:  start(), stop(), pause(), resume(), wait_for_key(timeout), mark_handled(event),
+#         latency_summary(), read_key(), read_line(prompt), wait_for_enter(timeout)
+# Output: open(), close(), print(...), show_status(...), invalidate_status(), tick(),
+#         celebration(goal_value, tier), display_refresh_seconds (None = no periodic redraw)
+
+
+def discard_typed_input():
+    """Drops keystrokes waiting in the console's input buffer, so they don't answer the next input()."""
+    if sys.platform == 'win32':
+        import msvcrt
+        while msvcrt.kbhit():
+            msvcrt.getwch()
+        return
+    import termios
+    try:
+        termios.tcflush(sys.stdin, termios.TCIFLUSH)
+    except (termios.error, OSError, ValueError): # stdin isn't a terminal
+        pass
+
+
+class SystemClock:
+    """Wall-clock time for live sessions."""
+
+    def now(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def today(self):
+        return datetime.now().strftime('%Y-%m-%d')
+
+
+class KeyboardInput:
+    """Physical keyboard: hook-based timer keys, keyboard.read_key() and input()."""
+
+    def __init__(self):
+        self.engine = KeyInputEngine()
+
+    def start(self):
+        self.engine.start()
+
+    def stop(self):
+        self.engine.stop()
+
+    def pause(self):
+        self.engine.pause()
+
+    def resume(self):
+        self.engine.resume()
+
+    def wait_for_key(self, timeout):
+        return self.engine.wait_for_key(timeout)
+
+    def mark_handled(self, key_event):
+        self.engine.mark_handled(key_event)
+
+    def latency_summary(self):
+        return self.engine.latency_summary()
+
+    def read_key(self):
+        import keyboard
+        return keyboard.read_key(suppress=False)
+
+    def read_line(self, prompt=""):
+        return input(prompt)
+
+    def wait_for_enter(self, timeout):
+        """Blocks until Enter is pressed or `timeout` seconds pass. Returns True if it was pressed."""
+        engine = KeyInputEngine(keys=('enter',))
+        engine.start()
+        try:
+            pressed = engine.wait_for_key(timeout) is not None
+        finally:
+            engine.stop()
+        if pressed:
+            discard_typed_input() # The hook sees Enter without consuming it
+        return pressed
+
+
+class ConsoleOutput:
+    """Terminal output: printed messages, the countdown status line, tick sound and celebrations."""
+
+    def __init__(self, sound_file_path, max_refresh_hz):
+        # 0 or less means uncapped, as in StatusLine: redraw whenever the visible text can change
+        self.display_refresh_seconds = 1.0 / max_refresh_hz if max_refresh_hz > 0 else TEXT_RESOLUTION_SECONDS
+        self.status_line = StatusLine(max_refresh_hz)
+        self.tick_player = TickPlayer(sound_file_path)
+
+    def open(self):
+        self.tick_player.start()
+
+    def close(self):
+        self.tick_player.close()
+
+    def print(self, *args, **kwargs):
+        print(*args, **kwargs)
+
+    def show_status(self, question_num, num_questions, remaining, bonus_pool, force=False):
+        self.status_line.render(question_num, num_questions, remaining, bonus_pool, force=force)
+
+    def invalidate_status(self):
+        self.status_line.invalidate()
+
+    def tick(self):
+        self.tick_player.play()
+
+    def celebration(self, goal_value, tier):
+        return celebration_for_goal(goal_value, tier)
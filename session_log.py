@@ -0,0 +1,231 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+from datetime import datetime
+
+from atomic_file import atomic_write
+
+# --- Layout of the segmented session log ---
+# <log_dir>/manifest.json            segment order, total row count, last session number
+# <log_dir>/sessions-YYYY-MM.csv     one append-only segment per month (.csv.gz once compressed)
+# <log_dir>/sessions-YYYY-MM.idx     sidecar index: row count, last session number, min/max date
+SESSION_FIELDNAMES = ['session_num', 'subject', 'date', 'total_time_taken', 'avg_time_per_q', 'bonus_at_end', 'total_questions_in_session']
+MANIFEST_NAME = "manifest.json"
+SEGMENT_PREFIX = "sessions-"
+
+
+def parse_session_row(row):
+    """Converts a CSV row's string values back to their original types. Raises ValueError on malformed rows."""
+    row['session_num'] = int(row.get('session_num', 0))
+    row['total_time_taken'] = float(row.get('total_time_taken', 0.0))
+    row['avg_time_per_q'] = float(row.get('avg_time_per_q', 0.0))
+    row['bonus_at_end'] = float(row.get('bonus_at_end', 0.0))
+    row['total_questions_in_session'] = int(row.get('total_questions_in_session', 0))
+    return row
+
+
+def iter_session_csv(csv_path):
+    """Yields the parsed rows of a flat session CSV, skipping malformed ones."""
+    with open(csv_path, mode='r', newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            try:
+                yield parse_session_row(row)
+            except ValueError as ve:
+                print(f"Warning: Skipping malformed row in CSV: {row} - {ve}")
+
+
+def segment_of(date):
+    """Monthly segment name ('YYYY-MM') for a session date. Raises ValueError unless it is YYYY-MM-DD."""
+    return datetime.strptime(str(date), '%Y-%m-%d').strftime('%Y-%m')
+
+
+def _write_json_atomically(path, data):
+    """Writes JSON to a temp file and renames it over `path` so readers never see a partial file."""
+    with atomic_write(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+class SessionLog:
+    """Append-only session history split into monthly segments with sidecar indexes.
+
+    The manifest keeps the running totals, so the next session number is read
+    in O(1) regardless of how much history exists, and the last N sessions only
+    touch the newest segments.
+    """
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self._manifest = None
+
+    # --- Paths and metadata ---
+    def _segment_path(self, segment, compressed=False):
+        return os.path.join(self.log_dir, f"{SEGMENT_PREFIX}{segment}.csv" + (".gz" if compressed else ""))
+
+    def _index_path(self, segment):
+        return os.path.join(self.log_dir, f"{SEGMENT_PREFIX}{segment}.idx")
+
+    def _manifest_path(self):
+        return os.path.join(self.log_dir, MANIFEST_NAME)
+
+    def exists(self):
+        """True if the log has been initialised on disk."""
+        return os.path.exists(self._manifest_path())
+
+    def manifest(self):
+        """Returns the manifest, loading it from disk on first use."""
+        if self._manifest is None:
+            if self.exists():
+                with open(self._manifest_path(), 'r', encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            else:
+                self._manifest = {'segments': [], 'row_count': 0, 'last_session_num': 0}
+        return self._manifest
+
+    def segment_index(self, segment):
+        """Returns the sidecar index of a segment."""
+        with open(self._index_path(segment), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def next_session_num(self):
+        """Session number for the next session, read straight from the manifest."""
+        return self.manifest()['last_session_num'] + 1
+
+    def row_count(self):
+        """Total number of sessions in the log."""
+        return self.manifest()['row_count']
+
+    # --- Writing ---
+    def append(self, session_data_dict):
+        """Appends one session to the segment for its month and updates the indexes. Returns True if it was written."""
+        return self.append_many([session_data_dict]) == 1
+
+    def append_many(self, sessions):
+        """Appends several sessions, writing each touched segment and index once.
+
+        Sessions whose date isn't YYYY-MM-DD have no segment and are skipped with
+        a warning. Returns the number of sessions written.
+        """
+        by_segment = {}
+        for session in sessions:
+            try:
+                segment = segment_of(session['date'])
+            except ValueError:
+                print(f"Warning: Skipping session {session.get('session_num')} with unreadable date '{session['date']}'.")
+                continue
+            by_segment.setdefault(segment, []).append(session)
+        if not by_segment:
+            return 0
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        manifest = self.manifest()
+
+        for segment, rows in by_segment.items():
+            if segment in manifest['segments']:
+                index = self.segment_index(segment)
+            else:
+                index = {'row_count': 0, 'last_session_num': 0, 'min_date': None, 'max_date': None, 'compressed': False}
+                manifest['segments'].append(segment)
+
+            if index['compressed']:
+                # gzip readers handle concatenated members, so appending keeps the segment valid
+                file = gzip.open(self._segment_path(segment, compressed=True), 'at', newline='', encoding='utf-8')
+            else:
+                file = open(self._segment_path(segment), mode='a', newline='', encoding='utf-8')
+            with file:
+                writer = csv.DictWriter(file, fieldnames=SESSION_FIELDNAMES)
+                if index['row_count'] == 0:
+                    writer.writeheader()
+                writer.writerows(rows)
+
+            for row in rows:
+                date = str(row['date'])
+                index['min_date'] = date if index['min_date'] is None else min(index['min_date'], date)
+                index['max_date'] = date if index['max_date'] is None else max(index['max_date'], date)
+                index['last_session_num'] = max(index['last_session_num'], int(row['session_num']))
+            index['row_count'] += len(rows)
+            _write_json_atomically(self._index_path(segment), index)
+
+            manifest['row_count'] += len(rows)
+            manifest['last_session_num'] = max(manifest['last_session_num'], index['last_session_num'])
+
+        manifest['segments'].sort()
+        _write_json_atomically(self._manifest_path(), manifest)
+        return sum(len(rows) for rows in by_segment.values())
+
+    def import_legacy_csv(self, csv_path):
+        """One-time import of a flat session CSV into the log. Does nothing once the log exists.
+
+        The log is built in <log_dir>.importing and renamed into place, so an
+        import that fails part way leaves no log behind and is retried from the
+        CSV next time instead of appending its rows twice.
+        """
+        if self.exists() or not os.path.exists(csv_path):
+            return 0
+        staging_dir = self.log_dir + ".importing"
+        shutil.rmtree(staging_dir, ignore_errors=True) # Left over from an interrupted import
+        staged = SessionLog(staging_dir)
+        imported = staged.append_many(iter_session_csv(csv_path))
+        if not staged.exists(): # Nothing importable: still mark the log as initialised so the import isn't retried
+            os.makedirs(staging_dir, exist_ok=True)
+            _write_json_atomically(staged._manifest_path(), staged.manifest())
+        if os.path.isdir(self.log_dir): # Segments without a manifest: keep them aside rather than mixing them in
+            shutil.rmtree(self.log_dir + ".incomplete", ignore_errors=True)
+            os.replace(self.log_dir, self.log_dir + ".incomplete")
+            print(f"Warning: Moved an incomplete session log to '{self.log_dir}.incomplete'.")
+        os.replace(staging_dir, self.log_dir)
+        self._manifest = None
+        return imported
+
+    def compress_old_segments(self, keep_recent=1):
+        """Gzips every segment except the newest `keep_recent` ones."""
+        segments = self.manifest()['segments']
+        for segment in segments[:max(len(segments) - keep_recent, 0)]:
+            index = self.segment_index(segment)
+            if index['compressed']:
+                continue
+            plain_path = self._segment_path(segment)
+            with open(plain_path, 'rb') as src, gzip.open(self._segment_path(segment, compressed=True), 'wb') as dst:
+                dst.write(src.read())
+            index['compressed'] = True
+            _write_json_atomically(self._index_path(segment), index)
+            os.remove(plain_path)
+
+    # --- Reading ---
+    def segment_paths(self):
+        """Paths of all segments, oldest first."""
+        paths = []
+        for segment in self.manifest()['segments']:
+            compressed = self.segment_index(segment)['compressed']
+            paths.append(self._segment_path(segment, compressed=compressed))
+        return paths
+
+    def _read_segment(self, segment):
+        index = self.segment_index(segment)
+        path = self._segment_path(segment, compressed=index['compressed'])
+        opener = gzip.open if index['compressed'] else open
+        sessions = []
+        with opener(path, mode='rt', newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                try:
+                    sessions.append(parse_session_row(row))
+                except ValueError as ve:
+                    print(f"Warning: Skipping malformed row in CSV: {row} - {ve}")
+        return sessions
+
+    def iter_sessions(self):
+        """Yields every session in the log, oldest segment first."""
+        for segment in self.manifest()['segments']:
+            yield from self._read_segment(segment)
+
+    def last_sessions(self, n):
+        """Returns the last `n` sessions, reading only as many segments as needed."""
+        if n <= 0:
+            return []
+        collected = []
+        for segment in reversed(self.manifest()['segments']):
+            collected = self._read_segment(segment) + collected
+            if len(collected) >= n:
+                break
+        return collected[-n:]
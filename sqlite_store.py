@@ -0,0 +1,158 @@
+import json
+import sqlite3
+from pathlib import Path
+
+from session_log import SESSION_FIELDNAMES
+from storage import StateStore
+
+
+class SQLiteStateStore(StateStore):
+    """Embedded SQLite backend (WAL mode) that commits end-of-session state in one transaction."""
+
+    def __init__(self, db_path, read_only=False):
+        self.db_path = db_path
+        if read_only: # Another device's or student's database (merge, report): never create, migrate or write it
+            self._conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+            return
+        self._conn = sqlite3.connect(db_path, check_same_thread=False) # Opened on the startup loader thread, used from the timer thread
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL") # WAL + NORMAL is still crash-safe for committed transactions
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_num INTEGER PRIMARY KEY,
+                    subject TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    total_time_taken REAL NOT NULL,
+                    avg_time_per_q REAL NOT NULL,
+                    bonus_at_end REAL NOT NULL,
+                    total_questions_in_session INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS sessions_by_date ON sessions (date);
+                CREATE INDEX IF NOT EXISTS sessions_by_subject_date ON sessions (subject, date);
+                CREATE TABLE IF NOT EXISTS daily_counts (
+                    date TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    celebrated_levels TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+            """)
+
+    # --- Key/value state ---
+    def _get_state(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_state(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def load_bonus_pool(self):
+        try:
+            return float(self._get_state('bonus_pool', 0.0))
+        except (sqlite3.Error, ValueError, TypeError) as e:
+            print(f"Error loading bonus pool from database: {e}. Starting with 0 bonus time.")
+            return 0.0
+
+    def save_bonus_pool(self, amount):
+        try:
+            with self._conn:
+                self._set_state('bonus_pool', float(amount))
+        except sqlite3.Error as e:
+            print(f"Error saving bonus pool to database: {e}")
+
+    # --- Daily tracker ---
+    def load_daily_tracker(self):
+        try:
+            row = self._conn.execute("SELECT date, count, celebrated_levels FROM daily_counts ORDER BY date DESC LIMIT 1").fetchone()
+        except sqlite3.Error as e:
+            print(f"Error loading daily questions tracker from database: {e}. Starting fresh.")
+            row = None
+        if row is None:
+            return {'date': None, 'count': 0, 'celebrated_levels': []}
+        return {'date': row[0], 'count': row[1], 'celebrated_levels': json.loads(row[2])}
+
+    def _upsert_daily(self, date, count, celebrated_levels):
+        self._conn.execute("INSERT OR REPLACE INTO daily_counts (date, count, celebrated_levels) VALUES (?, ?, ?)",
+                           (date, int(count), json.dumps(list(celebrated_levels))))
+
+    # --- Sessions ---
+    def next_session_num(self):
+        row = self._conn.execute("SELECT MAX(session_num) FROM sessions").fetchone() # Primary key lookup, O(log n)
+        return (row[0] or 0) + 1
+
+    def load_sessions(self):
+        cursor = self._conn.execute(f"SELECT {', '.join(SESSION_FIELDNAMES)} FROM sessions ORDER BY session_num")
+        return [dict(zip(SESSION_FIELDNAMES, row)) for row in cursor]
+
+    def _insert_sessions(self, sessions):
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO sessions ({', '.join(SESSION_FIELDNAMES)}) VALUES ({', '.join('?' for _ in SESSION_FIELDNAMES)})",
+            ([session[name] for name in SESSION_FIELDNAMES] for session in sessions))
+
+    def commit_session_end(self, date, daily_count, celebrated_levels, session_data_dict, bonus_pool):
+        try:
+            with self._conn: # One transaction: either all three are saved or none
+                self._upsert_daily(date, daily_count, celebrated_levels)
+                self._insert_sessions([session_data_dict])
+                self._set_state('bonus_pool', float(bonus_pool))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving session state to database: {e}")
+            return False
+
+    # --- One-time import of the file backend ---
+    def import_from(self, other_store):
+        """Copies state from another backend once. Returns False if an import already happened."""
+        if self._get_state('imported_from_files', False):
+            return False
+        sessions, duplicates, renumbered = self._resolve_collisions(other_store.load_sessions())
+        tracker = other_store.load_daily_tracker()
+        bonus_pool = other_store.load_bonus_pool()
+        with self._conn:
+            self._insert_sessions(sessions)
+            if tracker['date'] is not None:
+                self._upsert_daily(tracker['date'], tracker['count'], tracker['celebrated_levels'])
+            self._set_state('bonus_pool', bonus_pool)
+            self._set_state('imported_from_files', True)
+        print(f"INFO: Imported {len(sessions)} sessions, the daily tracker and the bonus pool into '{self.db_path}'.")
+        if duplicates or renumbered:
+            print(f"INFO: Skipped {duplicates} duplicate sessions and renumbered {renumbered} whose session numbers were already taken.")
+        return True
+
+    def _resolve_collisions(self, sessions):
+        """Keeps every distinct session: exact repeats of a stored row are dropped, and a different
+        session reusing a taken number gets the next free number after all existing and incoming ones.
+        Returns (sessions to insert, duplicates dropped, sessions renumbered)."""
+        columns = ', '.join(SESSION_FIELDNAMES)
+        taken = {row[0]: row for row in self._conn.execute(f"SELECT {columns} FROM sessions")}
+        next_free = max(list(taken) + [session['session_num'] for session in sessions], default=0) + 1
+        resolved, duplicates, renumbered = [], 0, 0
+        for session in sessions:
+            row = tuple(session[name] for name in SESSION_FIELDNAMES)
+            existing = taken.get(row[0])
+            if existing == row:
+                duplicates += 1
+                continue
+            if existing is not None:
+                session = dict(session, session_num=next_free)
+                row = (next_free,) + row[1:]
+                next_free += 1
+                renumbered += 1
+            taken[row[0]] = row
+            resolved.append(session)
+        return resolved, duplicates, renumbered
+
+    def close(self):
+        self._conn.close()
+
+
+def is_sqlite_file(path):
+    """True if `path` is an SQLite database (checked by its header, not its name)."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(16) == b"SQLite format 3\x00"
+    except (IOError, OSError):
+        return False
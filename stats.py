@@ -0,0 +1,302 @@
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+
+import numpy as np
+
+from atomic_file import atomic_write
+
+# --- Columnar cache layout ---
+# <cache_dir>/meta.json     row count, subject names and the fingerprint of every source file
+# <cache_dir>/<column>.bin  one raw little-endian array per column, memory-mapped on load
+CACHE_VERSION = 1
+COLUMNS = {
+    'session_num': np.int64,
+    'subject': np.int16, # Index into meta['subjects']
+    'day': np.int32, # Days since 1970-01-01
+    'total_time_taken': np.float64,
+    'avg_time_per_q': np.float64,
+    'bonus_at_end': np.float64,
+    'total_questions_in_session': np.int32,
+}
+
+
+class SessionColumns:
+    """Session history as typed, column-oriented NumPy arrays."""
+
+    def __init__(self, arrays, subjects):
+        self.arrays = arrays
+        self.subjects = subjects
+
+    def __len__(self):
+        return len(self.arrays['session_num'])
+
+    def __getitem__(self, column):
+        return self.arrays[column]
+
+
+# --- Cache building ---
+def _fingerprint(path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _read_rows(path, offset, header):
+    """Parses a CSV source from `offset` bytes in. Returns (columns as lists, header, end offset)."""
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            raw = f.read()
+        end_offset = os.path.getsize(path)
+    else:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            raw = f.read()
+        end_offset = offset + len(raw)
+
+    reader = csv.reader(io.StringIO(raw.decode('utf-8'), newline=''))
+    if offset == 0:
+        header = next(reader, None)
+    lists = {name: [] for name in ('session_num', 'subject_name', 'date', 'total_time_taken', 'avg_time_per_q', 'bonus_at_end', 'total_questions_in_session')}
+    if not header:
+        lists['date'] = np.empty(0, dtype='datetime64[D]')
+        return lists, header, end_offset
+
+    pos = {name: i for i, name in enumerate(header)}
+    for row in reader:
+        try:
+            session_num = int(row[pos['session_num']])
+            total_time = float(row[pos['total_time_taken']])
+            avg_time = float(row[pos['avg_time_per_q']])
+            bonus = float(row[pos['bonus_at_end']])
+            questions = int(row[pos['total_questions_in_session']])
+            date = row[pos['date']]
+        except (ValueError, IndexError, KeyError):
+            continue # Same policy as the loaders in main.py: skip malformed rows
+        lists['session_num'].append(session_num)
+        lists['subject_name'].append(row[pos['subject']])
+        lists['date'].append(date)
+        lists['total_time_taken'].append(total_time)
+        lists['avg_time_per_q'].append(avg_time)
+        lists['bonus_at_end'].append(bonus)
+        lists['total_questions_in_session'].append(questions)
+
+    try:
+        lists['date'] = np.asarray(lists['date'], dtype='datetime64[D]')
+    except ValueError: # Rare: drop rows whose date doesn't parse, then convert again
+        keep = []
+        for i, date in enumerate(lists['date']):
+            try:
+                np.datetime64(date, 'D')
+                keep.append(i)
+            except ValueError:
+                pass
+        lists = {name: [values[i] for i in keep] for name, values in lists.items()}
+        lists['date'] = np.asarray(lists['date'], dtype='datetime64[D]')
+    return lists, header, end_offset
+
+
+def _append_to_cache(cache_dir, lists, subjects):
+    """Encodes parsed rows and appends them to the column files."""
+    subject_codes = {name: i for i, name in enumerate(subjects)}
+    for name in lists['subject_name']:
+        if name not in subject_codes:
+            subject_codes[name] = len(subjects)
+            subjects.append(name)
+
+    encoded = {
+        'session_num': np.asarray(lists['session_num'], dtype=COLUMNS['session_num']),
+        'subject': np.fromiter((subject_codes[s] for s in lists['subject_name']), dtype=COLUMNS['subject'], count=len(lists['subject_name'])),
+        'day': np.asarray(lists['date'], dtype='datetime64[D]').astype(COLUMNS['day']),
+        'total_time_taken': np.asarray(lists['total_time_taken'], dtype=COLUMNS['total_time_taken']),
+        'avg_time_per_q': np.asarray(lists['avg_time_per_q'], dtype=COLUMNS['avg_time_per_q']),
+        'bonus_at_end': np.asarray(lists['bonus_at_end'], dtype=COLUMNS['bonus_at_end']),
+        'total_questions_in_session': np.asarray(lists['total_questions_in_session'], dtype=COLUMNS['total_questions_in_session']),
+    }
+    for name, array in encoded.items():
+        with open(os.path.join(cache_dir, f"{name}.bin"), 'ab') as f:
+            f.write(array.astype(array.dtype.newbyteorder('<'), copy=False).tobytes())
+    return len(encoded['session_num'])
+
+
+def _plan_update(old_meta, sources):
+    """Returns {path: start offset} for an incremental update, or None if a full rebuild is needed."""
+    if old_meta is None or old_meta.get('version') != CACHE_VERSION:
+        return None
+    old_sources = old_meta['sources']
+    new_fingerprints = [_fingerprint(p) for p in sources]
+    if [s['path'] for s in old_sources] != [f['path'] for f in new_fingerprints[:len(old_sources)]]:
+        return None # A source was removed, renamed (e.g. compressed) or reordered
+
+    plan = {}
+    for old, new in zip(old_sources, new_fingerprints):
+        if old['size'] == new['size'] and old['mtime_ns'] == new['mtime_ns']:
+            continue
+        if old['path'].endswith('.gz') or new['size'] < old['size']:
+            return None # Only plain, append-only segments can be read incrementally
+        plan[old['path']] = old['offset']
+    for new in new_fingerprints[len(old_sources):]:
+        plan[new['path']] = 0
+    return plan
+
+
+def load_columns(sources, cache_dir, rebuild=False):
+    """Loads session history from CSV sources through a memory-mapped columnar cache.
+
+    The cache is only touched when a source changed: grown append-only segments
+    are parsed from where the last build stopped, anything else triggers a full
+    rebuild.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, 'meta.json')
+    old_meta = None
+    if not rebuild and os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            old_meta = json.load(f)
+
+    plan = _plan_update(old_meta, sources)
+    if plan is None:
+        for name in COLUMNS: # Full rebuild
+            open(os.path.join(cache_dir, f"{name}.bin"), 'wb').close()
+        meta = {'version': CACHE_VERSION, 'rows': 0, 'subjects': [], 'sources': []}
+        plan = {os.path.abspath(p): 0 for p in sources}
+    else:
+        meta = old_meta
+
+    if plan:
+        by_path = {s['path']: s for s in meta['sources']}
+        for path in (os.path.abspath(p) for p in sources):
+            if path not in plan:
+                continue
+            previous = by_path.get(path, {})
+            lists, header, end_offset = _read_rows(path, plan[path], previous.get('header'))
+            meta['rows'] += _append_to_cache(cache_dir, lists, meta['subjects'])
+            fingerprint = _fingerprint(path)
+            fingerprint['offset'] = end_offset
+            fingerprint['header'] = header
+            by_path[path] = fingerprint
+        meta['sources'] = [by_path[os.path.abspath(p)] for p in sources]
+        with atomic_write(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    arrays = {}
+    for name, dtype in COLUMNS.items():
+        path = os.path.join(cache_dir, f"{name}.bin")
+        if meta['rows'] == 0:
+            arrays[name] = np.empty(0, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=np.dtype(dtype).newbyteorder('<'), mode='r', shape=(meta['rows'],))
+    return SessionColumns(arrays, meta['subjects'])
+
+
+# --- Vectorized analytics ---
+def subject_summary(columns):
+    """Per-subject session count, question count, total time and mean avg_time_per_q."""
+    subject = columns['subject']
+    n_subjects = len(columns.subjects)
+    counts = np.bincount(subject, minlength=n_subjects)
+    questions = np.bincount(subject, weights=columns['total_questions_in_session'], minlength=n_subjects)
+    total_time = np.bincount(subject, weights=columns['total_time_taken'], minlength=n_subjects)
+    avg_sum = np.bincount(subject, weights=columns['avg_time_per_q'], minlength=n_subjects)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_avg = np.where(counts > 0, avg_sum / counts, 0.0)
+    return {
+        name: {'sessions': int(counts[i]), 'questions': int(questions[i]), 'total_time': float(total_time[i]), 'mean_avg_time_per_q': float(mean_avg[i])}
+        for i, name in enumerate(columns.subjects) if counts[i] > 0
+    }
+
+
+def weekly_totals(columns):
+    """Question and time totals per ISO week (Monday start). Returns (week start dates, questions, seconds)."""
+    if len(columns) == 0:
+        return np.empty(0, dtype='datetime64[D]'), np.empty(0), np.empty(0)
+    week = (columns['day'].astype(np.int64) + 3) // 7 # 1970-01-01 was a Thursday
+    first_week = week.min()
+    offsets = week - first_week # Dense bin per week: O(n), no sort needed
+    sessions = np.bincount(offsets)
+    questions = np.bincount(offsets, weights=columns['total_questions_in_session'])
+    seconds = np.bincount(offsets, weights=columns['total_time_taken'])
+    active = np.flatnonzero(sessions)
+    week_starts = ((active + first_week) * 7 - 3).astype('datetime64[D]')
+    return week_starts, questions[active], seconds[active]
+
+
+def rolling_mean(values, window):
+    """Trailing rolling mean; the first window-1 entries average what is available so far."""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return values
+    cumulative = np.cumsum(np.concatenate(([0.0], values)))
+    ends = np.arange(1, len(values) + 1)
+    starts = np.maximum(ends - window, 0)
+    return (cumulative[ends] - cumulative[starts]) / (ends - starts)
+
+
+def bonus_trend(columns, window):
+    """Rolling mean of bonus_at_end in date order, plus the least-squares slope per session."""
+    day = columns['day']
+    bonus = np.asarray(columns['bonus_at_end'])
+    if len(day) > 1 and np.any(day[1:] < day[:-1]): # Logs are normally already in date order
+        bonus = bonus[np.argsort(day, kind='stable')]
+    rolled = rolling_mean(bonus, window)
+    slope = 0.0
+    if len(bonus) > 1:
+        x = np.arange(len(bonus), dtype=np.float64)
+        x -= x.mean()
+        slope = float(np.dot(x, bonus - bonus.mean()) / np.dot(x, x))
+    return rolled, slope
+
+
+def avg_time_percentiles(columns, percentiles=(50, 90, 99)):
+    """Percentiles of avg_time_per_q overall and per subject."""
+    avg_time = np.asarray(columns['avg_time_per_q'])
+    result = {'All': np.percentile(avg_time, percentiles)}
+    # Group rows by subject once (radix sort on the small int codes), then slice per subject
+    order = np.argsort(columns['subject'], kind='stable')
+    bounds = np.cumsum(np.bincount(columns['subject'], minlength=len(columns.subjects)))
+    grouped = avg_time[order]
+    start = 0
+    for name, end in zip(columns.subjects, bounds):
+        if end > start:
+            result[name] = np.percentile(grouped[start:end], percentiles)
+        start = end
+    return result
+
+
+# --- Command line entry point ---
+def run_stats_command(argv, default_sources, default_cache_dir):
+    """Entry point for `python main.py stats`."""
+    parser = argparse.ArgumentParser(prog="main.py stats", description="Analyze past Qimer sessions.")
+    parser.add_argument('--csv', nargs='+', metavar='PATH', help="Session CSV files to analyze instead of this machine's session log.")
+    parser.add_argument('--cache-dir', default=None, help="Where to keep the columnar cache.")
+    parser.add_argument('--weeks', type=int, default=8, help="How many recent weeks to list (default 8).")
+    parser.add_argument('--window', type=int, default=10, help="Rolling window for the bonus trend, in sessions (default 10).")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild the cache from scratch.")
+    args = parser.parse_args(argv)
+
+    sources = args.csv or default_sources
+    cache_dir = args.cache_dir or default_cache_dir
+    columns = load_columns(sources, cache_dir, rebuild=args.rebuild)
+    if len(columns) == 0:
+        print("No session history found.")
+        return
+
+    print(f"\n--- Session history: {len(columns)} sessions ---")
+    print("\nPer subject:")
+    for name, summary in subject_summary(columns).items():
+        print(f"  {name:<10} {summary['sessions']:>7} sessions  {summary['questions']:>9} questions  "
+              f"{summary['total_time'] / 3600:>8.1f} h  avg {summary['mean_avg_time_per_q']:.1f} s/question")
+
+    print(f"\nLast {args.weeks} weeks:")
+    week_starts, questions, seconds = weekly_totals(columns)
+    for week_start, q, s in zip(week_starts[-args.weeks:], questions[-args.weeks:], seconds[-args.weeks:]):
+        print(f"  week of {week_start}: {int(q):>6} questions  {s / 3600:.1f} h")
+
+    rolled, slope = bonus_trend(columns, args.window)
+    print(f"\nBonus at end: rolling mean over last {args.window} sessions {rolled[-1]:.1f} s, trend {slope:+.2f} s per session")
+
+    print("\nTime per question percentiles (p50 / p90 / p99):")
+    for name, values in avg_time_percentiles(columns).items():
+        print(f"  {name:<10} {values[0]:.1f} / {values[1]:.1f} / {values[2]:.1f} s")
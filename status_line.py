@@ -0,0 +1,46 @@
+import sys
+import time
+
+TEXT_RESOLUTION_SECONDS = 0.1 # format() shows tenths of a second; redrawing more often changes nothing
+
+
+class StatusLine:
+    """Single-line countdown display that only writes when the visible text changes.
+
+    The line shows the question index, the remaining time and the bonus pool.
+    Writes are also capped at `max_refresh_hz` (0 or less: uncapped), except for
+    forced renders (e.g. the final 0.0 before a timeout).
+    """
+
+    def __init__(self, max_refresh_hz=10, out=None):
+        self.min_interval = 1.0 / max_refresh_hz if max_refresh_hz > 0 else 0.0
+        self.out = out or sys.stdout
+        self._last_text = None
+        self._last_write_time = 0.0
+        self.writes = 0
+
+    @staticmethod
+    def format(question_num, num_questions, remaining, bonus_pool):
+        return f"Q {question_num}/{num_questions} | Time remaining: {max(remaining, 0.0):.1f} seconds | Bonus Pool: {bonus_pool:.1f}s"
+
+    def render(self, question_num, num_questions, remaining, bonus_pool, force=False):
+        """Redraws the line if its text changed. Returns True if anything was written."""
+        text = self.format(question_num, num_questions, remaining, bonus_pool)
+        if text == self._last_text:
+            return False
+        now = time.monotonic()
+        if not force and self._last_text is not None and now - self._last_write_time < self.min_interval:
+            return False
+
+        # Pad with spaces so a shorter line fully overwrites the previous one
+        padded = text.ljust(len(self._last_text)) if self._last_text else text
+        self.out.write("\r" + padded)
+        self.out.flush()
+        self._last_text = text
+        self._last_write_time = now
+        self.writes += 1
+        return True
+
+    def invalidate(self):
+        """Forgets the last rendered text, e.g. after other output moved the cursor to a new line."""
+        self._last_text = None
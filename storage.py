@@ -0,0 +1,62 @@
+import csv
+import os
+from abc import ABC, abstractmethod
+
+from atomic_file import atomic_write
+
+
+class StateStore(ABC):
+    """Interface for where Qimer keeps its persistent state.
+
+    A backend holds the bonus pool, the daily questions tracker and the session
+    history. Everything that changes when a session ends is handed over in a
+    single commit_session_end() call so backends that support transactions can
+    make it atomic.
+    """
+
+    @abstractmethod
+    def load_bonus_pool(self):
+        """Returns the saved bonus pool in seconds."""
+
+    @abstractmethod
+    def save_bonus_pool(self, amount):
+        """Saves the bonus pool in seconds."""
+
+    @abstractmethod
+    def load_daily_tracker(self):
+        """Returns {'date', 'count', 'celebrated_levels'} for the most recent day."""
+
+    @abstractmethod
+    def next_session_num(self):
+        """Returns the number for the next session."""
+
+    @abstractmethod
+    def load_sessions(self):
+        """Returns every past session as a dict with SESSION_FIELDNAMES keys."""
+
+    @abstractmethod
+    def commit_session_end(self, date, daily_count, celebrated_levels, session_data_dict, bonus_pool):
+        """Saves the daily tracker, the finished session and the bonus pool together."""
+
+    def export_sessions_csv(self, path):
+        """Writes the whole session history to one CSV file (atomically replaced), ordered as load_sessions()."""
+        from session_log import SESSION_FIELDNAMES
+        with atomic_write(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=SESSION_FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(self.load_sessions())
+
+    def session_csv_paths(self, export_dir):
+        """CSV files holding the whole session history, for tools that read CSV directly (stats).
+
+        By default the history is exported to <export_dir>/sessions.csv; backends
+        that already keep it as CSV return their own files.
+        """
+        os.makedirs(export_dir, exist_ok=True)
+        path = os.path.join(export_dir, "sessions.csv")
+        self.export_sessions_csv(path)
+        return [path]
+
+    def close(self):
+        """Releases any open resources."""
+        pass
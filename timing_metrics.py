@@ -0,0 +1,149 @@
+import time
+
+from atomic_file import atomic_write
+
+# Histogram bucket upper bounds, in seconds
+LOOP_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.15, 0.25, 0.5, 1.0)
+JITTER_BUCKETS = (0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1)
+
+
+class Histogram:
+    """Fixed-bucket histogram that also keeps the raw samples for percentiles."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.samples = []
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.samples.append(value)
+
+    def percentile(self, p):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(round(p / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+    def prometheus_lines(self, name):
+        lines = [f"# TYPE {name} histogram"]
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum {sum(self.samples):.9f}")
+        lines.append(f"{name}_count {len(self.samples)}")
+        return lines
+
+
+class TimerInstrumentation:
+    """Opt-in accuracy metrics for the question timer loop.
+
+    Measures each inner-loop iteration, how late the loop wakes up compared to
+    the deadline it asked for (jitter), how far the session clock drifts from a
+    monotonic reference per question segment, and how much real time was never
+    credited to any question (sound, pauses, prompts). When disabled every
+    method returns immediately.
+    """
+
+    def __init__(self, enabled, clock, session_num, reference=time.perf_counter):
+        self.enabled = enabled
+        self.clock = clock
+        self.session_num = session_num
+        self.reference = reference
+        self.loop_durations = Histogram(LOOP_BUCKETS)
+        self.wake_jitter = Histogram(JITTER_BUCKETS)
+        self.clock_drift = 0.0 # Session clock minus reference, summed over segments
+        self._started_at = None
+        self._last_iteration = None
+        self._wait_deadline = None
+        self._segment_clock_start = None
+        self._segment_reference_start = None
+
+    def start(self):
+        if self.enabled:
+            self._started_at = self.reference()
+
+    def segment_started(self):
+        if not self.enabled:
+            return
+        self._segment_clock_start = self.clock.now()
+        self._segment_reference_start = self.reference()
+        self._last_iteration = None
+
+    def iteration(self):
+        """Called at the top of every inner-loop iteration."""
+        if not self.enabled:
+            return
+        now = self.reference()
+        if self._last_iteration is not None:
+            self.loop_durations.observe(now - self._last_iteration)
+        self._last_iteration = now
+
+    def before_wait(self, timeout):
+        if self.enabled:
+            self._wait_deadline = self.reference() + timeout
+
+    def after_wait(self, woke_on_key):
+        """Records wake-up jitter for waits that ran to their deadline."""
+        if self.enabled and not woke_on_key and self._wait_deadline is not None:
+            self.wake_jitter.observe(max(self.reference() - self._wait_deadline, 0.0))
+
+    def segment_ended(self):
+        if not self.enabled or self._segment_clock_start is None:
+            return
+        clock_elapsed = self.clock.now() - self._segment_clock_start
+        reference_elapsed = self.reference() - self._segment_reference_start
+        self.clock_drift += clock_elapsed - reference_elapsed
+        self._segment_clock_start = None
+
+    def summary_lines(self, credited_seconds):
+        """Human-readable end-of-session summary."""
+        total = self.reference() - self._started_at
+        lines = ["--- Timer accuracy ---"]
+        for label, hist in (("Loop iteration", self.loop_durations), ("Wake-up jitter", self.wake_jitter)):
+            lines.append(f"{label}: n={len(hist.samples)}  p50 {hist.percentile(50) * 1000:.2f} ms  "
+                         f"p99 {hist.percentile(99) * 1000:.2f} ms  max {hist.percentile(100) * 1000:.2f} ms")
+            bounds = [f"<={b * 1000:g}ms" for b in hist.buckets] + ["+Inf"]
+            lines.append("  " + "  ".join(f"{b}:{c}" for b, c in zip(bounds, hist.counts) if c))
+        lines.append(f"Clock drift vs monotonic reference: {self.clock_drift * 1000:+.3f} ms")
+        lines.append(f"Time not credited to any question: {total - credited_seconds:.3f} s of {total:.3f} s")
+        return lines
+
+    def write_prometheus(self, path, credited_seconds):
+        """Writes the metrics in Prometheus textfile-collector format (atomically replaced).
+
+        No per-session label: every session updates the same series, and the
+        session number is exported as a gauge of its own.
+        """
+        total = self.reference() - self._started_at
+        lines = self.loop_durations.prometheus_lines("qimer_loop_iteration_seconds")
+        lines += self.wake_jitter.prometheus_lines("qimer_wake_jitter_seconds")
+        lines += [
+            "# TYPE qimer_session_number gauge",
+            f"qimer_session_number {self.session_num}",
+            "# TYPE qimer_clock_drift_seconds gauge",
+            f"qimer_clock_drift_seconds {self.clock_drift:.9f}",
+            "# TYPE qimer_uncredited_seconds gauge",
+            f"qimer_uncredited_seconds {total - credited_seconds:.9f}",
+            "# TYPE qimer_session_seconds gauge",
+            f"qimer_session_seconds {total:.9f}",
+        ]
+        with atomic_write(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+
+    def finish(self, credited_seconds, say, path):
+        """Prints the summary and writes the metrics file."""
+        if not self.enabled or self._started_at is None:
+            return
+        for line in self.summary_lines(credited_seconds):
+            say(line)
+        try:
+            self.write_prometheus(path, credited_seconds)
+        except IOError as e:
+            say(f"Error writing timer metrics to '{path}': {e}")
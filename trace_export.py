@@ -0,0 +1,130 @@
+import json
+import os
+import time
+
+from atomic_file import atomic_write
+
+# --- Chrome trace / Perfetto JSON (chrome://tracing, ui.perfetto.dev) ---
+# One process per session with two tracks: question segments and key actions on
+# "Questions", prompts / sound / animations on "Blocking calls". Bonus pool and
+# remaining time are counter tracks.
+PID = 1
+QUESTIONS_TID = 1
+BLOCKING_TID = 2
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'args', 'start')
+
+    def __init__(self, trace, name, args):
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = self.trace.clock()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.trace._complete(self.name, 'blocking', BLOCKING_TID, self.start, self.trace.clock(), self.args)
+        return False
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class SessionTrace:
+    """Opt-in timeline of one session, exported as Chrome trace JSON at the end.
+
+    Events are appended to a list only when something happens (a question
+    segment starts or ends, a key is handled, a blocking call returns), never
+    per countdown tick, and the file is written once by write(). When disabled
+    every method returns immediately.
+    """
+
+    def __init__(self, enabled, clock=time.monotonic):
+        self.enabled = enabled
+        self.clock = clock
+        self.events = []
+        self._origin = clock() if enabled else 0.0
+        self._question_start = None
+        self._question_num = None
+
+    def _us(self, t):
+        return round((t - self._origin) * 1e6, 3)
+
+    def _complete(self, name, category, tid, start, end, args=None):
+        event = {'name': name, 'cat': category, 'ph': 'X', 'pid': PID, 'tid': tid,
+                 'ts': self._us(start), 'dur': round((end - start) * 1e6, 3)}
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    # --- Questions ---
+    def question_started(self, question_num, remaining):
+        if not self.enabled:
+            return
+        self._question_num = question_num
+        self._question_start = self.clock()
+        self.counter('remaining_seconds', remaining)
+
+    def question_ended(self, outcome):
+        if not self.enabled or self._question_start is None:
+            return
+        self._complete(f"Question {self._question_num}", 'question', QUESTIONS_TID, self._question_start, self.clock(),
+                       {'outcome': outcome or 'ended'})
+        self._question_start = None
+
+    # --- Actions and counters ---
+    def instant(self, name, **args):
+        if not self.enabled:
+            return
+        event = {'name': name, 'cat': 'key', 'ph': 'i', 's': 't', 'pid': PID, 'tid': QUESTIONS_TID, 'ts': self._us(self.clock())}
+        if args:
+            event['args'] = args
+        self.events.append(event)
+
+    def counter(self, name, value):
+        if self.enabled:
+            self.events.append({'name': name, 'ph': 'C', 'pid': PID, 'ts': self._us(self.clock()), 'args': {name: round(value, 3)}})
+
+    def blocking_since(self, name, start, **args):
+        """Records a blocking span that began at `start` (on this trace's clock) and ends now."""
+        if self.enabled:
+            self._complete(name, 'blocking', BLOCKING_TID, start, self.clock(), args)
+
+    def blocking(self, name, **args):
+        """Context manager that records the enclosed call as a span on the blocking-calls track."""
+        return _Span(self, name, args) if self.enabled else NO_SPAN
+
+    # --- Export ---
+    def to_json(self, session_num):
+        metadata = [
+            {'name': 'process_name', 'ph': 'M', 'pid': PID, 'args': {'name': f"Qimer session {session_num}"}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': PID, 'tid': QUESTIONS_TID, 'args': {'name': "Questions"}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': PID, 'tid': BLOCKING_TID, 'args': {'name': "Blocking calls"}},
+        ]
+        return {'traceEvents': metadata + self.events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path, session_num, say=print):
+        """Writes the trace (atomically replaced). Returns True if a file was written."""
+        if not self.enabled:
+            return False
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with atomic_write(path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(self.to_json(session_num), separators=(',', ':')))
+            return True
+        except (IOError, OSError) as e:
+            say(f"Error writing session trace to '{path}': {e}")
+            return False